@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准脚本，从仓库根目录以 `python -m benchmarks.<name>` 运行
+"""
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio 引擎基准：在进程内注入文件系统延迟（模拟 NFS/SMB），对比同步与 async 引擎的完整分发耗时，并校验输出一致
+
+用法:
+  python -m benchmarks.async_bench --files 1000 --latency-ms 2 --concurrency 32 [--file-jobs 8]
+
+延迟注入（LatencyShim）只作用于语料目录下的路径：每次 open / os.stat / os.replace 前 sleep 指定时间，
+sleep 期间释放 GIL，与网络文件系统上阻塞在系统调用中的表现一致
+"""
+
+import argparse
+import builtins
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import corpus
+from scripts import log, settings_gen
+from scripts.config_loader import ConfigLoader
+from scripts.distributor import Distributor
+
+
+class LatencyShim:
+    """上下文管理器：root 之下的 open / os.stat / os.replace 每次调用增加 delay 秒延迟"""
+
+    def __init__(self, root, delay):
+        self.root = os.path.join(os.path.abspath(root), "")
+        self.delay = delay
+        self.calls = 0
+
+    def _slow(self, func):
+        def wrapper(path, *args, **kwargs):
+            if self.delay > 0 and isinstance(path, (str, os.PathLike)) and os.path.abspath(path).startswith(self.root):
+                self.calls += 1
+                time.sleep(self.delay)
+            return func(path, *args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        self._saved = (builtins.open, os.stat, os.replace)
+        builtins.open = self._slow(builtins.open)
+        os.stat = self._slow(os.stat)
+        os.replace = self._slow(os.replace)
+        return self
+
+    def __exit__(self, *exc):
+        builtins.open, os.stat, os.replace = self._saved
+        return False
+
+
+def snapshot(root):
+    """{相对路径: sha256}，用于比较两次运行的输出"""
+    result = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = Path(dirpath) / name
+            result[path.relative_to(root).as_posix()] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return result
+
+
+def run_once(config_path, engine, args):
+    loader = ConfigLoader(config_path)
+    distributor = Distributor(
+        workpath=loader.workpath,
+        cleanpath=loader.cleanpath,
+        content_rules=loader.content_rules,
+        tasks=loader.tasks,
+        settings_resolver=settings_gen.process,
+        content_cache_mb=loader.content_cache_mb,
+        file_jobs=args.file_jobs if engine == "sync" else 1,
+        engine=engine,
+        async_concurrency=args.concurrency,
+    )
+    start = time.perf_counter()
+    if not distributor.run():
+        raise RuntimeError("分发失败")
+    return time.perf_counter() - start, snapshot(loader.workpath)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio 引擎在高延迟文件系统下的耗时对比")
+    corpus.add_arguments(parser)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="每次文件系统调用注入的延迟（默认 2ms）")
+    parser.add_argument("--concurrency", type=int, default=32, help="async 引擎同时在途的读写数（默认 32）")
+    parser.add_argument("--file-jobs", type=int, default=1, help="同步引擎的任务内线程数（默认 1）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个引擎的重复次数（取最小值）")
+    parser.add_argument("--workdir", help="语料目录（默认使用临时目录，结束后删除）")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="llm_dist_async_bench_"))
+    print(f"🧪 生成语料: {args.files} 个文件 -> {workdir}")
+    config_path = corpus.generate(
+        workdir,
+        files=args.files,
+        size=args.size,
+        frontmatter=args.frontmatter,
+        links=args.links,
+        patterns=args.patterns,
+        seed=args.seed,
+    ).resolve()
+
+    log.configure(level="quiet")
+    cwd = os.getcwd()
+    results = {}
+    try:
+        os.chdir(workdir)
+        for engine in ("sync", "async"):
+            times = []
+            for _ in range(args.repeat):
+                with LatencyShim(workdir, args.latency_ms / 1000) as shim:
+                    elapsed, outputs = run_once(config_path, engine, args)
+                times.append(elapsed)
+            results[engine] = (min(times), outputs, shim.calls)
+            label = f"sync (file_jobs={args.file_jobs})" if engine == "sync" else f"async (concurrency={args.concurrency})"
+            print(f"  {label:<28}{min(times) * 1000:10.1f} ms  ({shim.calls} 次文件系统调用)")
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    sync_time, sync_outputs, _ = results["sync"]
+    async_time, async_outputs, _ = results["async"]
+    print(f"  加速比: {sync_time / async_time:.1f}x（延迟 {args.latency_ms} ms）")
+    if sync_outputs != async_outputs:
+        diff = sorted(set(sync_outputs.items()) ^ set(async_outputs.items()))
+        print(f"❌ 输出不一致: {len(diff)} 处，例如 {diff[:3]}")
+        raise SystemExit(1)
+    print(f"✅ 输出一致 ({len(sync_outputs)} 个文件)")
+
+
+if __name__ == "__main__":
+    main()
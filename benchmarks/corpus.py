@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成 skills 语料生成器：在指定目录下生成 agent-resources/skills 与对应的分发配置
+
+用法: python -m benchmarks.corpus OUT_DIR [--files 1000] [--size 2048] [--frontmatter 0.9] [--links 2] [--patterns 10]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+SKILLS_DIR = "agent-resources/skills"
+PERMISSIONS = ["allow", "allow", "allow", "deny", "ask"]
+WORDS = "skill rule agent review code project build test deploy cache path link task config content".split()
+
+
+def _skill_name(index):
+    return f"skill_{index:06d}"
+
+
+def _body(rng, size, links):
+    """生成约 size 字节的正文，包含 links 个指向其他 skill 的相对链接"""
+    lines = []
+    total = 0
+    for target in links:
+        line = f"See [{target}](./../{target}/SKILL.md) for details."
+        lines.append(line)
+        total += len(line) + 1
+    while total < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(12))
+        lines.append(line)
+        total += len(line) + 1
+    rng.shuffle(lines)
+    return "\n".join(lines) + "\n"
+
+
+def generate_skills(root, files=1000, size=2048, frontmatter=0.9, links=2, seed=0):
+    """
+    在 root/agent-resources/skills 下生成 files 个 skill（每个一个 SKILL.md）
+    frontmatter: 带 name/description frontmatter 的比例；links: 每个文件的平均链接数
+    返回生成的文件数
+    """
+    rng = random.Random(seed)
+    skills_dir = Path(root) / SKILLS_DIR
+    for index in range(files):
+        name = _skill_name(index)
+        skill_dir = skills_dir / name
+        skill_dir.mkdir(parents=True, exist_ok=True)
+
+        link_count = int(links) + (1 if rng.random() < links - int(links) else 0)
+        targets = [_skill_name(rng.randrange(files)) for _ in range(link_count)] if files > 1 else []
+
+        parts = []
+        if rng.random() < frontmatter:
+            parts.append(f"---\nname: {name}\ndescription: synthetic skill {index}\npermission: {rng.choice(PERMISSIONS)}\n---\n\n")
+        parts.append(f"# {name}\n\n")
+        parts.append(_body(rng, size, targets))
+        with open(skill_dir / "SKILL.md", "w", encoding="utf-8") as f:
+            f.write("".join(parts))
+    return files
+
+
+def build_config(files=1000, patterns=10, workpath="./out"):
+    """与 configs/rules_config.json 结构一致的 cursor / claude / codebuddy 三任务配置"""
+    content_rules = {
+        f"{SKILLS_DIR}/**/*.md": {
+            "filter": [
+                {
+                    "operation": "frontmatter_has",
+                    "description": "需包含name/description frontmatter",
+                    "fields": ["name", "description"],
+                    "scope": ["cursor"],
+                }
+            ],
+            "process": [
+                {
+                    "operation": "replace",
+                    "description": "删除文件开头的 frontmatter",
+                    "pattern": "^---\\s*\\n[\\s\\S]*?\\n---\\s*\\n",
+                    "replacement": "",
+                    "flags": [],
+                    "scope": ["cursor"],
+                },
+                {
+                    "operation": "append_start",
+                    "description": "cursor 目标添加 alwaysApply frontmatter",
+                    "content": "---\nalwaysApply: true\n---\n\n",
+                    "scope": ["cursor"],
+                },
+                {
+                    "operation": "rewrite_links_to_claude",
+                    "description": "将同目录相对链接指向 claude 任务的目标路径",
+                    "target_task": "claude",
+                    "link_prefix": "../..",
+                    "scope": ["cursor"],
+                },
+            ],
+        }
+    }
+    # 额外的按目录模式，均匀分布在各 skill 上
+    step = max(1, files // max(patterns, 1))
+    for i in range(patterns):
+        content_rules[f"{SKILLS_DIR}/{_skill_name((i * step) % max(files, 1))}/**/*.md"] = {
+            "process": [
+                {
+                    "operation": "append_end",
+                    "description": f"附加说明 {i}",
+                    "content": f"\n<!-- pattern {i} -->\n",
+                }
+            ]
+        }
+
+    source = {"type": "directory", "path": SKILLS_DIR, "pattern": "**/*.md"}
+    tasks = [
+        {
+            "name": "cursor",
+            "distribute": [
+                {
+                    "source": dict(source),
+                    "filter": [
+                        {
+                            "operation": "frontmatter_has",
+                            "description": "需包含name/description frontmatter",
+                            "fields": ["name", "description"],
+                            "negate": False,
+                        }
+                    ],
+                    "rename_rule": {"foldername": True, "lowercase": True, "replacements": [{"from": "_", "to": "-"}]},
+                    "copy": ".cursor/rules",
+                    "suffix": "mdc",
+                }
+            ],
+        },
+        {
+            "name": "claude",
+            "generate_settings": {"target": ".claude/settings.local.json", "default_permission": "allow"},
+            "distribute": [{"source": dict(source), "copy": ".claude/skills", "use_parent_dir": True}],
+        },
+        {
+            "name": "codebuddy",
+            "generate_settings": {"target": ".codebuddy/settings.local.json", "default_permission": "allow"},
+            "distribute": [{"source": dict(source), "copy": ".codebuddy/skills", "use_parent_dir": True}],
+        },
+    ]
+    return {
+        "workpath": workpath,
+        "cleanpath": [".cursor/rules", ".claude/skills", ".codebuddy/skills"],
+        "content_rules": content_rules,
+        "tasks": tasks,
+    }
+
+
+def generate(root, files=1000, size=2048, frontmatter=0.9, links=2, patterns=10, seed=0):
+    """生成语料与 root/bench_config.json，返回配置文件路径"""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    generate_skills(root, files=files, size=size, frontmatter=frontmatter, links=links, seed=seed)
+    config_path = root / "bench_config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(build_config(files=files, patterns=patterns), f, ensure_ascii=False, indent=2)
+    return config_path
+
+
+def add_arguments(parser):
+    parser.add_argument("--files", type=int, default=1000, help="skill 数量（每个 skill 一个 SKILL.md）")
+    parser.add_argument("--size", type=int, default=2048, help="每个文件正文的近似字节数")
+    parser.add_argument("--frontmatter", type=float, default=0.9, help="带 frontmatter 的文件比例 (0-1)")
+    parser.add_argument("--links", type=float, default=2, help="每个文件指向其他 skill 的平均链接数")
+    parser.add_argument("--patterns", type=int, default=10, help="额外的 content_rules 模式数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成 skills 语料与分发配置")
+    parser.add_argument("out", help="输出目录")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    config_path = generate(
+        args.out,
+        files=args.files,
+        size=args.size,
+        frontmatter=args.frontmatter,
+        links=args.links,
+        patterns=args.patterns,
+        seed=args.seed,
+    )
+    print(f"✅ 已生成 {args.files} 个 skill: {Path(args.out) / SKILLS_DIR}")
+    print(f"⚙️  配置: {config_path}（在 {args.out} 目录下运行 distribute_rules.py）")
+
+
+if __name__ == "__main__":
+    main()
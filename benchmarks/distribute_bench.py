@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分发全流程基准：生成合成语料，多次执行 Distributor.run 并统计各阶段耗时
+
+用法:
+  python -m benchmarks.distribute_bench --files 5000 --repeat 3 --output result.json
+  python -m benchmarks.distribute_bench --files 5000 --baseline result.json [--threshold 0.1]
+
+阶段: compile / precompute / clean / tasks / task:<name> / settings:<name> / finalize / total
+对比模式下总耗时与某阶段的最小值都比基线慢超过阈值（且绝对差超过 --min-delta-ms）时判定为退化，退出码为 1
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import corpus
+from scripts import log, settings_gen
+from scripts.config_loader import ConfigLoader
+from scripts.distributor import Distributor
+
+
+def run_once(config_path, args):
+    loader = ConfigLoader(config_path)
+    distributor = Distributor(
+        workpath=loader.workpath,
+        cleanpath=loader.cleanpath,
+        content_rules=loader.content_rules,
+        tasks=loader.tasks,
+        settings_resolver=settings_gen.process,
+        content_cache_mb=loader.content_cache_mb,
+        incremental=args.incremental,
+        jobs=args.jobs,
+        file_jobs=args.file_jobs,
+    )
+    start = time.perf_counter()
+    ok = distributor.run()
+    total = time.perf_counter() - start
+    if not ok:
+        raise RuntimeError("分发失败")
+    timings = dict(distributor.timings)
+    timings["total"] = total
+    return timings
+
+
+DEFAULT_REPEAT = 3
+# 对比基线时多运行几次，最小值受偶发干扰的影响更小
+BASELINE_REPEAT = 7
+PHASE_ORDER = ["compile", "precompute", "clean", "tasks", "task:", "settings:", "finalize", "fanout", "total"]
+
+
+def phase_key(name):
+    """按流水线顺序排列阶段名"""
+    for idx, prefix in enumerate(PHASE_ORDER):
+        if name == prefix or (prefix.endswith(":") and name.startswith(prefix)):
+            return (idx, name)
+    return (len(PHASE_ORDER), name)
+
+
+def summarize(runs):
+    """各阶段取中位数与最小值（秒）"""
+    phases = {}
+    for name in sorted({name for run in runs for name in run}, key=phase_key):
+        values = [run.get(name, 0.0) for run in runs]
+        phases[name] = {"median": statistics.median(values), "min": min(values)}
+    return phases
+
+
+def compare(result, baseline, threshold, min_delta):
+    """
+    返回退化阶段列表 [(phase, base, current, ratio)]，按最小值（best-of-N）比较：干扰只会让耗时变长，最小值比中位数稳定
+    阶段的相对变化与绝对差都超过阈值、且总耗时同样超过时才算退化；总耗时未退化时单个阶段的变化只提示为波动
+    """
+
+    def exceeds(base_ms, cur_ms):
+        ratio = cur_ms / base_ms if base_ms > 0 else 1.0
+        return ratio, ratio > 1 + threshold and cur_ms - base_ms > min_delta
+
+    base_total = baseline.get("phases", {}).get("total")
+    cur_total = result["phases"].get("total")
+    total_regressed = bool(base_total and cur_total) and exceeds(base_total["min"] * 1000, cur_total["min"] * 1000)[1]
+
+    regressions = []
+    print(f"\n📊 与基线对比 (最小值，阈值 +{threshold * 100:.0f}% 且 > {min_delta:.0f} ms):")
+    print(f"  {'阶段':<24}{'基线 ms':>12}{'当前 ms':>12}{'变化':>10}")
+    for name, base in sorted(baseline.get("phases", {}).items(), key=lambda item: phase_key(item[0])):
+        current = result["phases"].get(name)
+        if current is None:
+            continue
+        base_ms = base["min"] * 1000
+        cur_ms = current["min"] * 1000
+        ratio, over = exceeds(base_ms, cur_ms)
+        regressed = over and total_regressed
+        mark = "  ❌ 退化" if regressed else "  ⚠️  波动" if over else ""
+        print(f"  {name:<24}{base_ms:12.1f}{cur_ms:12.1f}{(ratio - 1) * 100:+9.1f}%{mark}")
+        if regressed:
+            regressions.append((name, base_ms, cur_ms, ratio))
+    if result["params"] != baseline.get("params"):
+        print("  ⚠️  语料或运行参数与基线不同，对比结果仅供参考")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分发全流程分阶段基准")
+    corpus.add_arguments(parser)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        help=f"重复运行次数（报告中位数，对比基线时取最小值；默认 {DEFAULT_REPEAT}，指定 --baseline 时 {BASELINE_REPEAT}）",
+    )
+    parser.add_argument("--incremental", action="store_true", help="以增量模式运行（首次运行后均为无变化的增量运行）")
+    parser.add_argument("--jobs", type=int, default=1, help="并行任务进程数")
+    parser.add_argument("--file-jobs", type=int, default=1, help="任务内并行线程数")
+    parser.add_argument("--workdir", help="语料目录（默认使用临时目录，结束后删除）")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--baseline", help="基线结果 JSON，对比并标记退化")
+    parser.add_argument("--threshold", type=float, default=0.1, help="退化判定阈值（相对基线的比例，默认 0.1）")
+    parser.add_argument("--min-delta-ms", type=float, default=20.0, help="忽略绝对差小于该值的波动（默认 20ms）")
+    args = parser.parse_args()
+    if args.repeat is None:
+        args.repeat = BASELINE_REPEAT if args.baseline else DEFAULT_REPEAT
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="llm_dist_bench_"))
+    params = {
+        "files": args.files,
+        "size": args.size,
+        "frontmatter": args.frontmatter,
+        "links": args.links,
+        "patterns": args.patterns,
+        "seed": args.seed,
+        "incremental": args.incremental,
+        "jobs": args.jobs,
+        "file_jobs": args.file_jobs,
+    }
+
+    print(f"🧪 生成语料: {args.files} 个文件 -> {workdir}")
+    gen_start = time.perf_counter()
+    config_path = corpus.generate(
+        workdir,
+        files=args.files,
+        size=args.size,
+        frontmatter=args.frontmatter,
+        links=args.links,
+        patterns=args.patterns,
+        seed=args.seed,
+    ).resolve()
+    print(f"  用时 {time.perf_counter() - gen_start:.1f}s")
+
+    log.configure(level="quiet")
+    cwd = os.getcwd()
+    runs = []
+    try:
+        os.chdir(workdir)
+        if args.incremental:
+            run_once(config_path, args)
+        for i in range(args.repeat):
+            timings = run_once(config_path, args)
+            runs.append(timings)
+            print(f"  第 {i + 1} 次: {timings['total'] * 1000:.1f} ms")
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "params": params,
+        "env": {"python": platform.python_version(), "platform": platform.platform()},
+        "runs": runs,
+        "phases": summarize(runs),
+    }
+
+    print("\n⏱️  各阶段耗时 (中位数):")
+    for name, values in result["phases"].items():
+        print(f"  {name:<24}{values['median'] * 1000:10.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已写入: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 个阶段退化")
+            sys.exit(1)
+        print("\n✅ 无退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+content_rules 路径匹配微基准：GlobIndex 与原线性扫描对比
+
+用法: python -m benchmarks.glob_index_bench [--patterns 500] [--paths 20000]
+"""
+
+import argparse
+import fnmatch
+import time
+from pathlib import PurePosixPath
+
+from scripts.glob_index import GlobIndex
+
+
+def linear_scan(config_path, file_name, task_rules):
+    """原 content_rules.process_content 的匹配逻辑（前缀 + 文件名 fnmatch）"""
+    matched_groups = []
+    if config_path in task_rules:
+        matched_groups.append(task_rules[config_path])
+    for pattern, group in task_rules.items():
+        if pattern == config_path:
+            continue
+        if "**" in pattern or "*" in pattern:
+            if "**" in pattern:
+                pattern_base = pattern.split("**")[0].rstrip("/")
+            else:
+                pattern_base = pattern.rsplit("/", 1)[0] if "/" in pattern else ""
+            if pattern_base:
+                if config_path.startswith(pattern_base):
+                    matched_groups.append(group)
+            else:
+                if fnmatch.fnmatch(file_name, pattern):
+                    matched_groups.append(group)
+    return matched_groups
+
+
+def build_patterns(count):
+    patterns = {"agent-resources/skills/**/*.md": "all", "*.mdc": "mdc"}
+    for i in range(count):
+        patterns[f"agent-resources/skills/skill_{i:05d}/**/*.md"] = f"dir-{i}"
+    return patterns
+
+
+def build_paths(count, skills):
+    return [f"agent-resources/skills/skill_{i % skills:05d}/doc_{i:06d}.md" for i in range(count)]
+
+
+def bench(label, fn, paths):
+    start = time.perf_counter()
+    total = 0
+    for path in paths:
+        total += len(fn(path))
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<12} {elapsed * 1000:9.1f} ms  ({elapsed / len(paths) * 1e6:7.2f} µs/路径, 命中 {total})")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GlobIndex 与线性扫描的匹配耗时对比")
+    parser.add_argument("--patterns", type=int, default=500, help="按目录划分的规则条目数")
+    parser.add_argument("--paths", type=int, default=20000, help="待匹配的路径数")
+    args = parser.parse_args()
+
+    patterns = build_patterns(args.patterns)
+    paths = build_paths(args.paths, max(args.patterns, 1))
+    print(f"📐 {len(patterns)} 个模式, {len(paths)} 个路径")
+
+    index = GlobIndex()
+    for pattern, value in patterns.items():
+        index.add(pattern, value)
+
+    linear = bench("linear", lambda p: linear_scan(p, PurePosixPath(p).name, patterns), paths)
+    indexed = bench("GlobIndex", index.match, paths)
+    print(f"  加速比: {linear / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
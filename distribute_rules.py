@@ -4,46 +4,299 @@
 分发入口：加载配置，调用 Distributor
 """
 
+import argparse
+import os
 import sys
 from pathlib import Path
 from scripts.config_loader import ConfigLoader
 from scripts.distributor import Distributor
-from scripts import settings_gen
+from scripts.link_graph import LinkGraph, LINK_GRAPH_FILE
+from scripts import archive_sink, async_engine, batch, fanout, frontmatter, settings_gen, log, planner, profiler, watcher
+from scripts.output_cache import OutputCache
 
 
-def main():
-    script_dir = Path(__file__).parent
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="通用 LLM 规则分发工具")
+    parser.add_argument(
+        "config",
+        nargs="*",
+        help="配置文件路径（默认 configs/rules_config.json）；多个配置文件或配置目录时在同一进程中批量运行",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量模式：依据 workpath 下的构建清单跳过输入与规则均未变化的文件",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="清单清理模式：不清空 cleanpath，只删除上次运行产生、本次已无来源的输出",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="并行执行任务的进程数（默认 1，即按顺序执行）",
+    )
+    parser.add_argument(
+        "--file-jobs",
+        type=int,
+        default=1,
+        help="任务内并行处理文件的线程数（默认 1），用于重叠网络文件系统的 I/O 等待",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=list(async_engine.ENGINES),
+        default=None,
+        help="执行引擎：sync 同步（默认）/ async asyncio 并发读写，适合源目录或 workpath 位于 NFS/SMB 等高延迟文件系统（覆盖配置中的 engine）",
+    )
+    parser.add_argument(
+        "--async-concurrency",
+        type=int,
+        default=async_engine.DEFAULT_CONCURRENCY,
+        help=f"async 引擎同时在途的文件读写数（默认 {async_engine.DEFAULT_CONCURRENCY}）",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=list(log.LEVELS),
+        default="verbose",
+        help="日志级别：quiet 仅错误 / summary 任务级进度 / verbose 逐文件明细（默认） / debug",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="等同于 --log-level quiet")
+    parser.add_argument("--log-json", action="store_true", help="以 JSON Lines 格式输出日志")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="监听模式：完整运行一次后持续监听源目录与配置文件，只重新分发受影响的文件",
+    )
+    parser.add_argument("--watch-poll", action="store_true", help="监听模式使用定时轮询代替 inotify")
+    parser.add_argument(
+        "--debounce-ms",
+        type=int,
+        default=watcher.DEFAULT_DEBOUNCE_MS,
+        help=f"监听模式下合并连续变化的等待时间（默认 {watcher.DEFAULT_DEBOUNCE_MS} ms）",
+    )
+    parser.add_argument(
+        "--fanout",
+        nargs="+",
+        action="extend",
+        default=[],
+        metavar="WORKPATH",
+        help="额外的工作区：输出只计算一次，再以 reflink / 硬链接 / 复制物化到这些目录（与配置中的 fanout 合并）",
+    )
+    parser.add_argument(
+        "--fanout-link",
+        choices=list(fanout.MODES),
+        default=fanout.DEFAULT_MODE,
+        help="工作区物化方式：auto 依次尝试 reflink、硬链接、复制（默认）",
+    )
+    parser.add_argument(
+        "--fanout-jobs",
+        type=int,
+        default=fanout.DEFAULT_JOBS,
+        help=f"并行同步的工作区数（默认 {fanout.DEFAULT_JOBS}）",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="PATH",
+        help="输出直接写入归档（.tar.gz / .tgz / .tar / .zip，- 为 stdout），不在 workpath 中生成目录树；条目排序与时间戳固定，结果可复现",
+    )
+    parser.add_argument(
+        "--archive-format",
+        choices=list(archive_sink.FORMATS),
+        help="归档格式（默认按扩展名推断，stdout 为 tar.gz）",
+    )
+    parser.add_argument(
+        "--output-cache",
+        metavar="DIR",
+        help="内容寻址的处理结果缓存目录（可指向共享挂载），输入与规则链相同的文件跳过规则处理（覆盖配置中的 output_cache_dir）",
+    )
+    parser.add_argument(
+        "--output-cache-mb",
+        type=float,
+        help="处理结果缓存的大小上限（MB），超出时按最近使用时间淘汰（覆盖配置中的 output_cache_mb）",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=profiler.DEFAULT_PROFILE_FILE,
+        metavar="PATH",
+        help=f"剖析模式：运行结束输出各阶段、规则与读写的耗时排行，完整数据写入 PATH（默认 {profiler.DEFAULT_PROFILE_FILE}）",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="计划模式：只输出各 task 的源文件 -> 目标路径映射及适用的过滤器与规则，不处理内容、不写输出",
+    )
+    parser.add_argument("--plan-json", metavar="PATH", help="计划模式下将完整计划写入 JSON 文件（隐含 --plan）")
+    parser.add_argument(
+        "--links-to",
+        metavar="PATH",
+        help="查询上次运行保存的链接图：列出链接指向 PATH 的源文件，不执行分发",
+    )
+    parser.add_argument(
+        "--save-link-graph",
+        action="store_true",
+        help="保存链接图供 --links-to 查询（--incremental / --prune / --watch 时总是保存）",
+    )
+    return parser.parse_args(argv)
 
-    # 支持命令行参数传递配置文件路径
-    if len(sys.argv) > 1:
-        config_file = Path(sys.argv[1])
-        if not config_file.is_absolute():
-            config_file = script_dir / config_file
-    else:
-        config_file = script_dir / "configs" / "rules_config.json"
-
-    if not config_file.exists():
-        print(f"❌ 配置文件不存在: {config_file}")
-        print(f"\n用法: python distribute_rules.py [配置文件路径]")
-        print(f"默认: python distribute_rules.py  (使用 configs/rules_config.json)")
-        sys.exit(1)
 
+def build_distributor(config_file, args, shared=None):
+    """shared: 批量运行时共享的缓存（batch.SharedCaches）"""
     loader = ConfigLoader(config_file)
-    print(f"⚙️  已加载配置: {config_file}")
+    log.summary("⚙️  已加载配置: %s", config_file)
 
-    def settings_resolver(**kwargs):
-        return settings_gen.process(**kwargs)
+    output_sink = None
+    if args.archive:
+        output_sink = archive_sink.ArchiveSink(args.archive, loader.workpath, args.archive_format)
 
-    distributor = Distributor(
+    output_cache = None
+    cache_dir = args.output_cache or loader.output_cache_dir
+    if cache_dir:
+        cache_mb = args.output_cache_mb if args.output_cache_mb is not None else loader.output_cache_mb
+        output_cache = OutputCache(cache_dir, cache_mb)
+
+    return Distributor(
         workpath=loader.workpath,
         cleanpath=loader.cleanpath,
         content_rules=loader.content_rules,
         tasks=loader.tasks,
-        settings_resolver=settings_resolver,
+        settings_resolver=settings_gen.process,
+        content_cache_mb=loader.content_cache_mb,
+        frontmatter_mode=loader.frontmatter_mode,
+        link_resolution=loader.link_resolution,
+        incremental=args.incremental,
+        prune=args.prune,
+        jobs=args.jobs,
+        file_jobs=args.file_jobs,
+        profile_path=args.profile,
+        fanout=list(loader.fanout) + args.fanout,
+        fanout_jobs=args.fanout_jobs,
+        fanout_link=args.fanout_link,
+        engine=args.engine or loader.engine,
+        async_concurrency=args.async_concurrency,
+        output_sink=output_sink,
+        output_cache=output_cache,
+        save_links=args.save_link_graph or args.watch,
+        **(shared.kwargs() if shared else {}),
     )
-    distributor.run()
+
+
+def query_links_to(config_file, path):
+    """输出链接指向 path 的 (task, 分发单元, 源文件)，返回是否找到链接图"""
+    loader = ConfigLoader(config_file)
+    graph_path = Path(loader.workpath) / LINK_GRAPH_FILE
+    if not graph_path.exists():
+        log.error("❌ 链接图不存在: %s（请先以 --save-link-graph、--incremental 或 --prune 运行一次分发）", graph_path, event="error")
+        return False
+
+    graph = LinkGraph.load(graph_path)
+    ref_config_path = os.path.relpath(os.path.abspath(path)).replace("\\", "/")
+    referrers = graph.referrers(ref_config_path)
+    if not referrers:
+        log.result("🔗 没有文件链接到 %s", ref_config_path, event="links_to", path=ref_config_path, count=0)
+        return True
+
+    log.result("🔗 %d 处链接指向 %s:", len(referrers), ref_config_path, event="links_to", path=ref_config_path, count=len(referrers))
+    for (task_name, unit_idx, config_path), target_task in referrers:
+        log.result(
+            "  %s  [%s #%d，按 %s 的目标路径重写]",
+            config_path,
+            task_name,
+            unit_idx,
+            target_task,
+            event="link_referrer",
+            source=config_path,
+            task=task_name,
+            unit=unit_idx,
+            target_task=target_task,
+        )
+    return True
+
+
+def show_plan(config_file, json_path=None):
+    """输出分发计划，返回是否成功"""
+    loader = ConfigLoader(config_file)
+    try:
+        frontmatter.configure(loader.frontmatter_mode)
+        plan = planner.build_plan(loader.tasks, loader.content_rules)
+    except ValueError as e:
+        log.error("\n❌ %s", e, event="error")
+        return False
+
+    for line in planner.format_plan(plan):
+        log.result("%s", line, event="plan")
+    if json_path:
+        planner.write_plan(plan, json_path)
+        log.result("\n💾 计划已写入: %s", json_path, event="plan_saved", path=str(json_path))
+    return True
+
+
+def main():
+    script_dir = Path(__file__).parent
+    args = parse_args()
+    log.configure(level="quiet" if args.quiet else args.log_level, json_lines=args.log_json)
+    if args.archive == archive_sink.STDOUT:
+        # stdout 留给归档数据，日志改写到 stderr
+        log.configure(stream=sys.stderr)
+
+    # 支持命令行参数传递配置文件路径（可多个，或配置目录）
+    config_paths = []
+    for config_arg in args.config:
+        config_path = Path(config_arg)
+        if not config_path.is_absolute():
+            config_path = script_dir / config_path
+        config_paths.append(config_path)
+    if not config_paths:
+        config_paths = [script_dir / "configs" / "rules_config.json"]
+
+    missing = [path for path in config_paths if not path.exists()]
+    config_files = batch.expand_configs(config_paths)
+    if missing or not config_files:
+        for path in missing:
+            log.error("❌ 配置文件不存在: %s", path, event="error")
+        if not missing:
+            log.error("❌ 配置目录中没有 .json 配置文件: %s", ", ".join(str(p) for p in config_paths), event="error")
+        log.error("\n用法: python distribute_rules.py [配置文件或目录 ...] [--incremental] [--prune] [--jobs N] [--file-jobs N] [--log-level LEVEL] [--profile [PATH]] [--plan] [--watch]")
+        log.error("默认: python distribute_rules.py  (使用 configs/rules_config.json)")
+        sys.exit(1)
+
+    if len(config_paths) > 1 or config_paths[0].is_dir():
+        if args.links_to or args.plan or args.plan_json or args.watch or args.archive:
+            log.error("❌ --links-to / --plan / --watch / --archive 只支持单个配置文件", event="error")
+            sys.exit(1)
+        if not batch.run_batch(config_files, lambda path, shared: build_distributor(path, args, shared)):
+            sys.exit(1)
+        return
+    config_file = config_files[0]
+
+    if args.links_to:
+        if not query_links_to(config_file, args.links_to):
+            sys.exit(1)
+        return
+
+    if args.plan or args.plan_json:
+        if not show_plan(config_file, args.plan_json):
+            sys.exit(1)
+        return
+
+    if args.watch:
+        if args.archive:
+            log.error("❌ --watch 不支持 --archive", event="error")
+            sys.exit(1)
+        watcher.watch(
+            config_file,
+            lambda: build_distributor(config_file, args),
+            poll=args.watch_poll,
+            debounce_ms=args.debounce_ms,
+        )
+        return
+
+    if not build_distributor(config_file, args).run():
+        sys.exit(1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+库 API：以配置 dict 运行分发，结果 (task, target_path, content) 经输出目标（sink）返回或流式交给调用方
+
+    from scripts import api
+
+    result = api.distribute(config)                      # 默认 MemorySink，不写磁盘、不输出日志
+    for task, target_path, content in result["sink"].results:
+        ...
+
+    for task, target_path, content in api.iter_outputs(config):   # 边处理边产出
+        ...
+
+输出目标:
+  MemorySink     - 结果保存在内存中（results 按写出顺序，files 按 (task, target_path) 保留最后一次写入）
+  CallbackSink   - 每个输出调用 callback(task, target_path, content)
+  ArchiveSink    - 写入可复现的 tar.gz / tar / zip 归档（scripts/archive_sink.py）
+  FilesystemSink - 写入目录（默认为配置中的 workpath，与命令行运行一致）
+
+target_path 为相对 workpath 的 / 分隔路径；源路径与命令行运行一样相对于当前工作目录
+日志级别、frontmatter 解析方式等为进程级设置，同一进程中不要同时运行多次分发
+file_jobs > 1 或 engine="async" 时 emit 可能在工作线程中调用，调用顺序不保证与文件顺序一致
+"""
+
+import os
+import queue
+import threading
+from pathlib import Path
+
+from scripts import archive_sink, log, settings_gen
+from scripts.config_loader import ConfigLoader
+from scripts.distributor import Distributor
+from scripts.output_cache import OutputCache
+from scripts.output_writer import write_if_changed
+
+
+class Sink:
+    """输出目标基类：子类实现 emit()，返回是否实际写入（None 视为写入）"""
+
+    # 输出是否写入配置中的 workpath（是时与命令行运行一样清理 cleanpath、保存链接图，settings 合并已有文件）
+    materializes = False
+
+    def emit(self, task, target_path, content):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemorySink(Sink):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.results = []
+        self.files = {}
+
+    def emit(self, task, target_path, content):
+        with self._lock:
+            self.results.append((task, target_path, content))
+            self.files[(task, target_path)] = content
+        return True
+
+
+class CallbackSink(Sink):
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, task, target_path, content):
+        return self.callback(task, target_path, content)
+
+
+class ArchiveSink(Sink):
+    def __init__(self, dest, fmt=None):
+        self._archive = archive_sink.ArchiveSink(dest, ".", fmt)
+
+    def emit(self, task, target_path, content):
+        return self._archive.write(target_path, content)
+
+    def close(self):
+        self._archive.close()
+
+
+class FilesystemSink(Sink):
+    """root 为 None 时写入配置中的 workpath；内容未变化的文件不重写"""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else None
+        self.materializes = root is None
+
+    def emit(self, task, target_path, content):
+        return write_if_changed(self.root / target_path, content)
+
+
+class _SinkWriter:
+    """把 Sink 适配为 Distributor 的输出目标（OutputWriter 的接口）"""
+
+    def __init__(self, sink, workpath):
+        self.sink = sink
+        self.workpath = Path(workpath)
+        if isinstance(sink, FilesystemSink) and sink.root is None:
+            sink.root = self.workpath
+        self.materializes = sink.materializes
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def write(self, path, content, task=None):
+        target_path = os.path.relpath(os.path.abspath(path), os.path.abspath(self.workpath)).replace("\\", "/")
+        written = self.sink.emit(task, target_path, content) is not False
+        with self._lock:
+            if written:
+                self.written += 1
+            else:
+                self.unchanged += 1
+        return written
+
+    def reset_stats(self):
+        with self._lock:
+            self.written = 0
+            self.unchanged = 0
+
+    def merge_stats(self, stats):
+        with self._lock:
+            self.written += stats.get("written", 0)
+            self.unchanged += stats.get("unchanged", 0)
+
+    def stats(self):
+        return {"written": self.written, "unchanged": self.unchanged}
+
+    def export(self):
+        return None
+
+    def merge(self, data):
+        pass
+
+    def close(self):
+        self.sink.close()
+
+
+def build_distributor(config, sink, **options):
+    """
+    按配置 dict 构造 Distributor，输出交给 sink
+    options: engine / async_concurrency / file_jobs / frontmatter_mode / link_resolution / output_cache（目录）/ profile_path / save_links
+    任务在当前进程中执行（sink 可能不可跨进程传递），不支持 jobs
+    """
+    if options.get("jobs", 1) > 1:
+        raise ValueError("库 API 在当前进程中执行任务，不支持 jobs > 1")
+    loader = ConfigLoader.from_dict(config)
+    # 预先编译的规则经 plan_cache 在 run() 中复用
+    options.setdefault("plan_cache", {})
+    output_cache = None
+    cache_dir = options.pop("output_cache", None) or loader.output_cache_dir
+    if cache_dir:
+        output_cache = OutputCache(cache_dir, loader.output_cache_mb)
+    return Distributor(
+        workpath=loader.workpath,
+        cleanpath=loader.cleanpath,
+        content_rules=loader.content_rules,
+        tasks=loader.tasks,
+        settings_resolver=settings_gen.process,
+        content_cache_mb=loader.content_cache_mb,
+        frontmatter_mode=options.pop("frontmatter_mode", loader.frontmatter_mode),
+        link_resolution=options.pop("link_resolution", loader.link_resolution),
+        engine=options.pop("engine", loader.engine),
+        output_sink=_SinkWriter(sink, loader.workpath),
+        output_cache=output_cache,
+        **options,
+    )
+
+
+def validate(distributor):
+    """检查运行选项并编译内容规则，配置无效（未知引擎、无效正则等）时抛出 ValueError"""
+    distributor.check_options()
+    try:
+        distributor.compile_plans()
+    except ValueError as e:
+        raise ValueError(f"内容规则编译失败: {e}") from e
+
+
+def distribute(config, sink=None, quiet=True, **options):
+    """
+    运行一次完整分发
+    sink 缺省为 MemorySink；quiet 时运行期间只输出错误日志（结束后恢复原日志级别）
+    返回 {"ok": 是否全部成功, "sink": sink, "outputs": 写入统计, "timings": 各阶段耗时}
+    配置无效时在开始处理前抛出 ValueError；处理文件或写出失败时 ok 为 False（详见错误日志）
+    """
+    sink = sink if sink is not None else MemorySink()
+    distributor = build_distributor(config, sink, **options)
+    validate(distributor)
+    return _run(distributor, sink, quiet)
+
+
+def _run(distributor, sink, quiet):
+    previous_level = log.get_config()["level"]
+    if quiet:
+        log.configure(level="quiet")
+    try:
+        ok = distributor.run()
+    finally:
+        log.configure(level=previous_level)
+    return {
+        "ok": ok,
+        "sink": sink,
+        "outputs": distributor.output_writer.stats(),
+        "timings": dict(distributor.timings),
+    }
+
+
+_DONE = object()
+
+
+def iter_outputs(config, max_pending=256, quiet=True, **options):
+    """
+    在后台线程中运行分发，逐个产出 (task, target_path, content)
+    最多缓冲 max_pending 个结果（调用方消费慢时分发暂停）
+    配置无效时抛出 ValueError；分发失败时在产出全部结果后抛出 RuntimeError
+    提前结束迭代时取消分发：正在处理的文件完成后不再处理新文件（其结果被丢弃），等待后台线程结束后返回
+    """
+    results = queue.Queue(maxsize=max_pending)
+    stopped = threading.Event()
+    outcome = {}
+
+    def offer(item):
+        # 调用方已停止迭代时不再等待队列空位
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def emit(task, target_path, content):
+        offer((task, target_path, content))
+        return True
+
+    distributor = build_distributor(config, CallbackSink(emit), **options)
+    validate(distributor)
+
+    def run():
+        try:
+            outcome["result"] = _run(distributor, None, quiet)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            offer(_DONE)
+
+    worker = threading.Thread(target=run, name="llm-dist-api", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stopped.set()
+        distributor.cancel()
+        worker.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    if not outcome["result"]["ok"]:
+        raise RuntimeError("分发失败（详见错误日志）")
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - config: 配置 dict
+      - sink（可选，缺省 MemorySink）
+      - options（可选）
+    返回: distribute 结果
+    """
+    return distribute(ctx.get("config", {}), ctx.get("sink"), **ctx.get("options", {}))
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+归档输出（--archive）：分发结果直接写入 tar.gz / tar / zip 归档或 stdout，不在 workpath 中生成目录树
+
+可复现：条目按路径排序，时间戳固定（SOURCE_DATE_EPOCH，未设置时为 1980-01-01），
+属主、权限与 gzip 头均为固定值，相同输入得到逐字节相同的归档
+内容统一以 utf-8、\\n 换行写入，与平台无关
+
+为按路径排序，运行期间的输出暂存在匿名临时文件中（内存中只有路径到偏移的索引），
+结束时按路径顺序从暂存文件直接写入目标（同目录临时文件，完成后原子替换）或 stdout
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+from scripts import log, profiler
+from scripts.output_writer import atomic_open
+
+FORMATS = ("tar.gz", "tar", "zip")
+DEFAULT_FORMAT = "tar.gz"
+STDOUT = "-"
+# zip 能表示的最早时间
+DEFAULT_EPOCH = 315532800
+FILE_MODE = 0o644
+COPY_CHUNK = 1024 * 1024
+
+_SUFFIXES = ((".tar.gz", "tar.gz"), (".tgz", "tar.gz"), (".tar", "tar"), (".zip", "zip"))
+
+
+def detect_format(dest):
+    """按文件扩展名推断格式，无法推断（含 stdout）时为 tar.gz"""
+    name = str(dest).lower()
+    for suffix, fmt in _SUFFIXES:
+        if name.endswith(suffix):
+            return fmt
+    return DEFAULT_FORMAT
+
+
+def source_date_epoch():
+    try:
+        return max(int(os.environ["SOURCE_DATE_EPOCH"]), DEFAULT_EPOCH)
+    except (KeyError, ValueError):
+        return DEFAULT_EPOCH
+
+
+class _CountingWriter:
+    """只写流的包装：记录写出的字节数，提供 tarfile 需要的 tell()"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, data):
+        self.stream.write(data)
+        self.count += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.count
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _write_tar(fileobj, entries, mtime, compress):
+    """entries: [(name, size, src)]，src 为已定位到条目内容开头的文件对象"""
+    # gzip 头不写文件名，时间戳固定
+    gz = gzip.GzipFile(filename="", mode="wb", fileobj=fileobj, mtime=0) if compress else None
+    with tarfile.open(fileobj=gz or fileobj, mode="w", format=tarfile.PAX_FORMAT) as tar:
+        for name, size, src in entries:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = mtime
+            info.mode = FILE_MODE
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            tar.addfile(info, src)
+    if gz:
+        gz.close()
+
+
+def _write_zip(fileobj, entries, mtime):
+    """fileobj 需可 seek（不可 seek 时 zipfile 改用数据描述符，字节与写入文件时不同）"""
+    date_time = tuple(time.gmtime(mtime))[:6]
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, size, src in entries:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.external_attr = (0o100000 | FILE_MODE) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            info.file_size = size
+            with archive.open(info, "w") as dest:
+                remaining = size
+                while remaining:
+                    chunk = src.read(min(COPY_CHUNK, remaining))
+                    dest.write(chunk)
+                    remaining -= len(chunk)
+
+
+class ArchiveSink:
+    """
+    代替 OutputWriter 的输出目标：write(path, content) 把内容追加到暂存文件并记录 workpath 下的相对路径，
+    close() 时按路径顺序写出归档
+    同一路径多次写入时保留最后一次（与写入目录树时“后写覆盖”一致）
+    多进程执行任务时，子进程的条目经 export() / merge() 回传主进程
+    """
+
+    # 输出不落在 workpath 中：不清理 cleanpath、不保存链接图与清单
+    materializes = False
+
+    def __init__(self, dest, root, fmt=None):
+        fmt = fmt or detect_format(dest)
+        if fmt not in FORMATS:
+            raise ValueError(f"未知的归档格式: {fmt}（可选: {', '.join(FORMATS)}）")
+        self.dest = str(dest)
+        self.root = Path(root)
+        self.format = fmt
+        self._lock = threading.Lock()
+        # 暂存文件在第一次写入时创建；_index: {条目路径: (偏移, 长度)}
+        self._spool = None
+        self._index = {}
+        self.written = 0
+
+    def __getstate__(self):
+        return {"dest": self.dest, "root": str(self.root), "format": self.format}
+
+    def __setstate__(self, state):
+        self.__init__(state["dest"], state["root"], state["format"])
+
+    def arcname(self, path):
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root)).replace("\\", "/")
+        if rel == ".." or rel.startswith("../") or os.path.isabs(rel):
+            raise ValueError(f"输出路径不在 workpath 之下，无法写入归档: {path}")
+        return rel
+
+    def _add(self, name, data):
+        """调用方持有 _lock"""
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile(prefix="llm_dist_archive_")
+        offset = self._spool.seek(0, os.SEEK_END)
+        self._spool.write(data)
+        self._index[name] = (offset, len(data))
+
+    def write(self, path, content, task=None):
+        name = self.arcname(path)
+        data = content.encode("utf-8")
+        with self._lock:
+            self._add(name, data)
+            self.written += 1
+        return True
+
+    def _entries(self):
+        """按路径顺序产出 (name, size, src)，src 已定位到条目内容开头"""
+        for name in sorted(self._index):
+            offset, size = self._index[name]
+            self._spool.seek(offset)
+            yield name, size, self._spool
+
+    def _discard(self):
+        if self._spool is not None:
+            self._spool.close()
+        self._spool = None
+        self._index = {}
+
+    def export(self):
+        """子进程中调用：取出本任务写入的条目 {name: bytes} 并清空暂存"""
+        with self._lock:
+            entries = {name: src.read(size) for name, size, src in self._entries()}
+            self._discard()
+            return entries
+
+    def merge(self, entries):
+        if not entries:
+            return
+        with self._lock:
+            for name, data in entries.items():
+                self._add(name, data)
+
+    def reset_stats(self):
+        with self._lock:
+            self.written = 0
+
+    def merge_stats(self, stats):
+        with self._lock:
+            self.written += stats.get("written", 0)
+
+    def stats(self):
+        return {"written": self.written, "unchanged": 0}
+
+    def write_to(self, fileobj):
+        """按路径顺序把归档写入 fileobj（zip 需要可 seek 的文件）"""
+        mtime = source_date_epoch()
+        with self._lock:
+            if self.format == "zip":
+                _write_zip(fileobj, self._entries(), mtime)
+            else:
+                _write_tar(fileobj, self._entries(), mtime, compress=self.format == "tar.gz")
+
+    def close(self):
+        """写出归档（stdout 或文件，文件先写临时文件再原子替换），返回字节数"""
+        files = len(self._index)
+        try:
+            with profiler.timer("io", "archive"):
+                if self.dest != STDOUT:
+                    dest = Path(self.dest)
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    with atomic_open(dest) as f:
+                        self.write_to(f)
+                        size = f.tell()
+                elif self.format == "zip":
+                    # 经临时文件生成，保持与写入文件时逐字节相同
+                    with tempfile.TemporaryFile(prefix="llm_dist_archive_") as f:
+                        self.write_to(f)
+                        size = f.tell()
+                        f.seek(0)
+                        shutil.copyfileobj(f, sys.stdout.buffer, COPY_CHUNK)
+                    sys.stdout.buffer.flush()
+                else:
+                    out = _CountingWriter(sys.stdout.buffer)
+                    self.write_to(out)
+                    out.flush()
+                    size = out.count
+        finally:
+            self._discard()
+        profiler.add_bytes("written", size)
+        log.summary(
+            "\n🗜️  归档: %d 个文件 -> %s (%s，%d 字节)",
+            files,
+            "stdout" if self.dest == STDOUT else self.dest,
+            self.format,
+            size,
+            event="archive",
+            files=files,
+            dest=self.dest,
+            format=self.format,
+            size=size,
+        )
+        return size
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - dest: 归档路径或 "-"（stdout）
+      - root: 条目路径的相对根目录（workpath）
+      - files: {path: content}
+      - format（可选）
+    返回: 归档字节数
+    """
+    sink = ArchiveSink(ctx.get("dest"), ctx.get("root", "."), ctx.get("format"))
+    for path, content in ctx.get("files", {}).items():
+        sink.write(path, content)
+    return sink.close()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio 引擎（--engine async）：面向源目录或 workpath 位于 NFS/SMB 等高延迟文件系统的场景
+
+- 源文件读取、frontmatter 开头读取与输出写入经 AsyncFiles 卸载到有界 I/O 线程池，同时在途的 I/O 数受 concurrency 限制
+- 路径预计算前并发读取所有需要过滤的文件开头，预计算本身只查表
+- 分发单元内并发读取源文件，内容规则处理在独立的执行器中运行，写出经同一 I/O 层
+- 目标路径相同的文件按原顺序依次处理，日志按文件顺序整块输出，结果与同步引擎一致
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts import frontmatter, log
+from scripts.paths import collect_source
+from scripts.rename_rules import process as rename_process
+
+ENGINES = ("sync", "async")
+DEFAULT_ENGINE = "sync"
+DEFAULT_CONCURRENCY = 32
+
+# 未预读的源文件：处理时经内容缓存同步读取
+_NOT_READ = object()
+
+
+class AsyncFiles:
+    """线程卸载的异步文件层：读取经内容缓存，写入经 OutputWriter（保留未变化不重写与计数）"""
+
+    def __init__(self, content_store=None, output_writer=None, concurrency=DEFAULT_CONCURRENCY):
+        self.content_store = content_store
+        self.output_writer = output_writer
+        self._semaphore = asyncio.Semaphore(max(1, int(concurrency or 1)))
+
+    async def _call(self, func, *args):
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def read(self, file_path):
+        return await self._call(self.content_store.read, file_path)
+
+    async def read_header(self, file_path):
+        return await self._call(frontmatter.read_header, file_path)
+
+    async def write(self, path, content, task=None):
+        return await self._call(self.output_writer.write, path, content, task)
+
+
+def _run(coro, concurrency):
+    """在新的事件循环中运行，默认执行器（asyncio.to_thread 使用）为 concurrency 个线程"""
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        io_pool = ThreadPoolExecutor(max_workers=max(1, int(concurrency or 1)), thread_name_prefix="llm-dist-io")
+        loop.set_default_executor(io_pool)
+        return await coro
+
+    return asyncio.run(main())
+
+
+async def _settle(awaitable):
+    """返回结果或异常，异常延后到使用处抛出"""
+    try:
+        return await awaitable
+    except Exception as e:
+        return e
+
+
+def prefetch_headers(tasks, walk_cache=None, concurrency=DEFAULT_CONCURRENCY):
+    """
+    并发读取各任务中带分发过滤器的源文件开头，返回 {str(file_path): header 或异常}
+    供 precompute_all_path_mappings 的 read_content 查表
+    """
+
+    async def run():
+        files = AsyncFiles(concurrency=concurrency)
+        paths = {}
+        for task in tasks:
+            for dist_rule in task.get("distribute", []):
+                source_config = dist_rule.get("source")
+                if not source_config or not dist_rule.get("filter"):
+                    continue
+                for file_path, _ in collect_source(source_config, walk_cache):
+                    paths.setdefault(str(file_path), file_path)
+        keys = list(paths)
+        results = await asyncio.gather(*(_settle(files.read_header(paths[key])) for key in keys))
+        return dict(zip(keys, results))
+
+    return _run(run(), concurrency)
+
+
+def header_reader(headers):
+    """预读结果的查表函数；未预读的文件同步读取"""
+
+    def read(file_path):
+        header = headers.get(str(file_path))
+        if header is None:
+            return frontmatter.read_header(file_path)
+        if isinstance(header, Exception):
+            raise header
+        return header
+
+    return read
+
+
+def run_unit(distributor, unit, files, counts, concurrency=DEFAULT_CONCURRENCY):
+    """以 asyncio 处理一个分发单元内的文件，按文件顺序更新清单与计数"""
+    _run(_run_unit(distributor, unit, files, counts, concurrency), concurrency)
+
+
+async def _run_unit(distributor, unit, files, counts, concurrency):
+    loop = asyncio.get_running_loop()
+    io = AsyncFiles(distributor.content_store, distributor.output_writer, concurrency)
+    _, _, _, dist_rule, _ = unit
+
+    groups = {}
+    for index, (file_path, _) in enumerate(files):
+        target = rename_process(task_name="", ctx={"source_path": file_path, "dist_config": dist_rule})
+        groups.setdefault(target, []).append(index)
+    group_list = list(groups.values())
+    group_of = {index: group_idx for group_idx, indices in enumerate(group_list) for index in indices}
+
+    def write(path, content, task=None):
+        # 在执行器线程中调用：交给事件循环经 I/O 层写出并等待结果
+        return asyncio.run_coroutine_threadsafe(io.write(path, content, task), loop).result()
+
+    def process(file_path, config_path, content):
+        def read(path):
+            if path != file_path or content is _NOT_READ:
+                return distributor.content_store.read(path)
+            if isinstance(content, Exception):
+                raise content
+            return content
+
+        with log.capture() as records:
+            outcome = distributor._process_file(unit, file_path, config_path, read=read, write=write)
+        return records, outcome
+
+    def needs_content(file_path):
+        # 增量模式下输入签名未变的文件多半可以跳过，不预先读取（需要处理时在执行器中同步读取）
+        manifest = distributor.manifest
+        return not (manifest and distributor.incremental and manifest.input_unchanged(file_path))
+
+    async def run_group(indices):
+        results = {}
+        for index in indices:
+            if distributor.cancelled:
+                break
+            file_path, config_path = files[index]
+            content = await _settle(io.read(file_path)) if needs_content(file_path) else _NOT_READ
+            results[index] = await loop.run_in_executor(cpu_pool, process, file_path, config_path, content)
+        return results
+
+    # 处理线程在写出时等待 I/O 层，线程数与 concurrency 相同，避免写出被处理线程数限制
+    concurrency = max(1, int(concurrency or 1))
+    window = concurrency * 4
+    pending = {}
+    next_group = 0
+    cpu_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm-dist-cpu")
+    try:
+        for index in range(len(files)):
+            if distributor.cancelled:
+                break
+            while next_group < len(group_list) and next_group < group_of[index] + window:
+                pending[next_group] = asyncio.ensure_future(run_group(group_list[next_group]))
+                next_group += 1
+            group_idx = group_of[index]
+            result = (await pending[group_idx]).get(index)
+            if result is None:
+                # 取消时组内剩余的文件未处理
+                break
+            records, outcome = result
+            if index == group_list[group_idx][-1]:
+                del pending[group_idx]
+            log.replay(records)
+            distributor._apply_outcome(unit, files[index][1], outcome, counts)
+    finally:
+        # 出错时先等在途的文件处理完（其写出需要事件循环继续运行），再关闭执行器
+        if pending:
+            await asyncio.gather(*pending.values(), return_exceptions=True)
+        cpu_pool.shutdown()
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - tasks
+      - walk_cache（可选）
+      - concurrency（可选）
+    返回: prefetch_headers 结果
+    """
+    return prefetch_headers(ctx.get("tasks", []), ctx.get("walk_cache"), ctx.get("concurrency", DEFAULT_CONCURRENCY))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量运行：在同一进程中依次运行多个配置，共享目录遍历缓存、源文件内容缓存、
+frontmatter 解析结果（frontmatter 模块级缓存）与已编译的内容规则
+"""
+
+import time
+from pathlib import Path
+
+from scripts import log
+from scripts.config_loader import ConfigLoader
+from scripts.content_store import ContentStore, DEFAULT_MAX_MB
+from scripts.walk_cache import WalkCache
+
+
+def expand_configs(paths):
+    """配置文件与目录（目录下的 *.json，按文件名排序）展开为配置文件列表，去重并保持顺序"""
+    configs = []
+    for path in paths:
+        path = Path(path)
+        candidates = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        for candidate in candidates:
+            if candidate not in configs:
+                configs.append(candidate)
+    return configs
+
+
+def _cache_mb(config_files):
+    """共享内容缓存的上限取各配置 content_cache_mb 的最大值"""
+    sizes = []
+    for config_file in config_files:
+        try:
+            sizes.append(ConfigLoader(config_file).content_cache_mb)
+        except Exception:
+            continue
+    return max(sizes, default=DEFAULT_MAX_MB)
+
+
+class SharedCaches:
+    """批量运行中各配置共用的缓存；作为 Distributor 的 content_store / walk_cache / plan_cache 传入"""
+
+    def __init__(self, content_cache_mb=DEFAULT_MAX_MB):
+        self.content_store = ContentStore(max_bytes=int(content_cache_mb * 1024 * 1024))
+        self.walk_cache = WalkCache()
+        self.plan_cache = {}
+
+    def kwargs(self):
+        return {"content_store": self.content_store, "walk_cache": self.walk_cache, "plan_cache": self.plan_cache}
+
+    def after_run(self, distributor):
+        """丢弃该配置可能写入或删除的路径下的缓存，后面的配置以这些输出为源时不会读到旧结果"""
+        for root in distributor.output_roots():
+            self.walk_cache.invalidate_under(root)
+            self.content_store.invalidate_under(root)
+
+
+def run_batch(config_files, build):
+    """
+    依次运行各配置，build(config_file, shared) 返回 Distributor
+    单个配置失败不影响后续配置；输出每个配置的摘要与总耗时，返回是否全部成功
+    """
+    shared = SharedCaches(_cache_mb(config_files))
+    results = []
+    batch_start = time.perf_counter()
+
+    for index, config_file in enumerate(config_files, 1):
+        log.summary("\n%s", "#" * 60)
+        log.summary("📚 [%d/%d] %s", index, len(config_files), config_file, event="batch_config", config=str(config_file))
+        log.summary("%s", "#" * 60)
+
+        start = time.perf_counter()
+        distributor = None
+        try:
+            distributor = build(config_file, shared)
+            ok = distributor.run()
+        except Exception as e:
+            log.error("\n❌ 配置 %s 运行失败: %s", config_file, e, event="error", config=str(config_file))
+            ok = False
+        if distributor is not None:
+            shared.after_run(distributor)
+
+        result = {"config": str(config_file), "ok": ok, "seconds": time.perf_counter() - start}
+        if distributor is not None:
+            result["outputs"] = distributor.output_writer.stats()
+            result["content_cache"] = distributor.content_store.stats()
+            result["walk_cache"] = distributor.walk_cache.stats()
+        results.append(result)
+
+    total = time.perf_counter() - batch_start
+    failed = [r for r in results if not r["ok"]]
+
+    log.summary("\n%s", "#" * 60)
+    log.summary("📚 批量运行汇总:")
+    for result in results:
+        mark = "✅" if result["ok"] else "❌"
+        if "outputs" in result:
+            log.summary(
+                "  %s %s  %.1f ms，写入 %d，未变化 %d，内容缓存命中 %d/%d，目录遍历 %d 次",
+                mark,
+                result["config"],
+                result["seconds"] * 1000,
+                result["outputs"]["written"],
+                result["outputs"]["unchanged"],
+                result["content_cache"]["hits"],
+                result["content_cache"]["hits"] + result["content_cache"]["misses"],
+                result["walk_cache"]["walks"],
+                event="batch_result",
+                **result,
+            )
+        else:
+            log.summary("  %s %s  %.1f ms", mark, result["config"], result["seconds"] * 1000, event="batch_result", **result)
+    log.summary(
+        "⏱️  总耗时 %.1f ms，%d 个配置，失败 %d",
+        total * 1000,
+        len(results),
+        len(failed),
+        event="batch_done",
+        seconds=total,
+        configs=len(results),
+        failed=[r["config"] for r in failed],
+    )
+    log.summary("%s", "#" * 60)
+    log.flush()
+    return not failed
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - configs: 配置文件或目录列表
+      - build: build(config_file, shared) -> Distributor
+    返回: 是否全部成功
+    """
+    return run_batch(expand_configs(ctx.get("configs", [])), ctx.get("build"))
@@ -7,12 +7,26 @@
 import json
 from pathlib import Path
 
+from scripts.async_engine import DEFAULT_ENGINE
+from scripts.content_store import DEFAULT_MAX_MB
+from scripts.frontmatter import DEFAULT_MODE as DEFAULT_FRONTMATTER_MODE
+from scripts.link_resolver import DEFAULT_MODE as DEFAULT_LINK_RESOLUTION
+from scripts.output_cache import DEFAULT_MAX_MB as DEFAULT_OUTPUT_CACHE_MB
+
 
 class ConfigLoader:
     def __init__(self, config_file: Path):
         self.config_file = Path(config_file)
         self.config = self._load()
 
+    @classmethod
+    def from_dict(cls, config):
+        """直接使用已加载的配置 dict（库 API）"""
+        loader = cls.__new__(cls)
+        loader.config_file = None
+        loader.config = dict(config)
+        return loader
+
     def _load(self):
         if not self.config_file.exists():
             raise FileNotFoundError(f"配置文件不存在: {self.config_file}")
@@ -35,4 +49,30 @@ class ConfigLoader:
     def tasks(self):
         return self.config.get("tasks", [])
 
+    @property
+    def content_cache_mb(self):
+        return self.config.get("content_cache_mb", DEFAULT_MAX_MB)
+
+    @property
+    def frontmatter_mode(self):
+        return self.config.get("frontmatter_mode", DEFAULT_FRONTMATTER_MODE)
+
+    @property
+    def fanout(self):
+        return self.config.get("fanout", [])
+
+    @property
+    def link_resolution(self):
+        return self.config.get("link_resolution", DEFAULT_LINK_RESOLUTION)
+
+    @property
+    def engine(self):
+        return self.config.get("engine", DEFAULT_ENGINE)
 
+    @property
+    def output_cache_dir(self):
+        return self.config.get("output_cache_dir")
+
+    @property
+    def output_cache_mb(self):
+        return self.config.get("output_cache_mb", DEFAULT_OUTPUT_CACHE_MB)
@@ -5,9 +5,16 @@
 """
 
 import re
-import fnmatch
 
+from scripts import log, profiler
 from scripts.filters import passes_filters, check_scope
+from scripts.glob_index import GlobIndex
+
+REGEX_FLAGS = {
+    "DOTALL": re.DOTALL,
+    "MULTILINE": re.MULTILINE,
+    "IGNORECASE": re.IGNORECASE,
+}
 
 
 def build_task_rules(content_rules, task_name):
@@ -25,98 +32,189 @@ def build_task_rules(content_rules, task_name):
     return task_rules
 
 
+# 规则执行结果对应的日志模板（仅在 verbose 级别格式化）
+MESSAGES = {
+    "append_start": "      ✓ %s (开头追加)",
+    "append_end": "      ✓ %s (末尾追加)",
+    "replaced": "      ✓ %s (正则替换)",
+    "not_matched": "      - %s (未匹配)",
+    "links_rewritten": "      ✓ %s (链接重写)",
+    "no_links": "      - %s (无链接重写)",
+}
+
+
+# 操作处理函数：返回 (新内容, MESSAGES 中的键或 None)
+def _op_append_start(compiled, content, file_path_obj, link_rewriter):
+    if not compiled.content:
+        return content, None
+    return compiled.content + content, "append_start"
+
+
+def _op_append_end(compiled, content, file_path_obj, link_rewriter):
+    if not compiled.content:
+        return content, None
+    return content + compiled.content, "append_end"
+
+
+def _op_replace(compiled, content, file_path_obj, link_rewriter):
+    new_content = compiled.regex.sub(compiled.replacement, content)
+    if new_content != content:
+        return new_content, "replaced"
+    return content, "not_matched"
+
+
+def _op_rewrite_links(compiled, content, file_path_obj, link_rewriter):
+    if not link_rewriter:
+        return content, None
+    new_content = link_rewriter(content, file_path_obj, compiled.rule)
+    if new_content != content:
+        return new_content, "links_rewritten"
+    return content, "no_links"
+
+
+OPERATIONS = {
+    "append_start": _op_append_start,
+    "append_end": _op_append_end,
+    "replace": _op_replace,
+    "rewrite_links_to_claude": _op_rewrite_links,
+}
+
+
+class CompiledRule:
+    """单条 process 规则的编译结果：预编译正则、预解析 flags、预绑定操作函数"""
+
+    __slots__ = ("rule", "description", "operation", "handler", "regex", "replacement", "content")
+
+    def __init__(self, rule, index):
+        self.rule = rule
+        self.operation = rule.get("operation", "replace")
+        self.description = rule.get("description", f"规则 {index}")
+        self.handler = OPERATIONS.get(self.operation)
+        self.regex = None
+        self.replacement = rule.get("replacement", "")
+        self.content = rule.get("content", "")
+
+        if self.operation == "replace":
+            pattern = rule.get("pattern")
+            if not pattern:
+                self.handler = None
+                return
+            flags = 0
+            for flag_name in rule.get("flags", []):
+                flags |= REGEX_FLAGS.get(flag_name, 0)
+            try:
+                self.regex = re.compile(pattern, flags)
+            except re.error as e:
+                raise ValueError(f"规则 '{self.description}' 正则无效: {pattern} - {e}") from e
+
+    def apply(self, content, file_path_obj, link_rewriter=None):
+        if self.handler is None:
+            return content, None
+        return self.handler(self, content, file_path_obj, link_rewriter)
+
+
+def compile_process_rules(rules):
+    """编译 process 规则列表；已编译的列表原样返回"""
+    compiled = []
+    for i, rule in enumerate(rules or [], 1):
+        compiled.append(rule if isinstance(rule, CompiledRule) else CompiledRule(rule, i))
+    return compiled
+
+
+class RuleGroup:
+    """一个路径模式下、已按 task scope 过滤并编译的规则组"""
+
+    __slots__ = ("pattern", "filters", "process", "raw")
+
+    def __init__(self, pattern, raw_group):
+        self.pattern = pattern
+        self.raw = raw_group
+        self.filters = raw_group.get("filter", [])
+        self.process = compile_process_rules(raw_group.get("process", []))
+
+    def get(self, key, default=None):
+        return self.raw.get(key, default)
+
+
+class TaskRulePlan:
+    """
+    单个 task 的内容规则执行计划，每次运行每个 task 只构建一次
+    构建时完成 scope 过滤与正则编译，无效正则在此处即报错
+    路径模式进入 GlobIndex，按文件查询匹配的规则组
+    """
+
+    def __init__(self, task_rules):
+        self.groups = {pattern: RuleGroup(pattern, group) for pattern, group in task_rules.items()}
+        self.index = GlobIndex()
+        for pattern, group in self.groups.items():
+            self.index.add(pattern, group)
+
+    def match(self, config_path):
+        return self.index.match(config_path)
+
+    def rule_count(self):
+        return sum(len(g.raw.get("process", [])) + len(g.filters) for g in self.groups.values())
+
+    def items(self):
+        return self.groups.items()
+
+    def values(self):
+        return self.groups.values()
+
+    def __contains__(self, pattern):
+        return pattern in self.groups
+
+    def __getitem__(self, pattern):
+        return self.groups[pattern]
+
+
+def compile_task_rules(content_rules, task_name):
+    return TaskRulePlan(build_task_rules(content_rules, task_name))
+
+
+def _as_plan(task_rules):
+    return task_rules if isinstance(task_rules, TaskRulePlan) else TaskRulePlan(task_rules or {})
+
+
 def apply_process_rules(rules, content, file_path_obj, link_rewriter=None):
     if not rules:
         return content
 
-    for i, rule in enumerate(rules, 1):
-        operation = rule.get("operation", "replace")
-        description = rule.get("description", f"规则 {i}")
-
+    verbose = log.enabled(log.VERBOSE)
+    for compiled in compile_process_rules(rules):
         try:
-            if operation == "append_start":
-                append_content = rule.get("content", "")
-                if append_content:
-                    content = append_content + content
-                    print(f"      ✓ {description} (开头追加)")
-
-            elif operation == "append_end":
-                append_content = rule.get("content", "")
-                if append_content:
-                    content = content + append_content
-                    print(f"      ✓ {description} (末尾追加)")
-
-            elif operation == "replace":
-                pattern = rule.get("pattern")
-                replacement = rule.get("replacement", "")
-                flags_list = rule.get("flags", [])
-                if not pattern:
-                    continue
-                flags = 0
-                for flag_name in flags_list:
-                    if flag_name == "DOTALL":
-                        flags |= re.DOTALL
-                    elif flag_name == "MULTILINE":
-                        flags |= re.MULTILINE
-                    elif flag_name == "IGNORECASE":
-                        flags |= re.IGNORECASE
-                new_content = re.sub(pattern, replacement, content, flags=flags)
-                if new_content != content:
-                    print(f"      ✓ {description} (正则替换)")
-                    content = new_content
-                else:
-                    print(f"      - {description} (未匹配)")
-
-            elif operation == "rewrite_links_to_claude" and link_rewriter:
-                new_content = link_rewriter(content, file_path_obj, rule)
-                if new_content != content:
-                    print(f"      ✓ {description} (链接重写)")
-                    content = new_content
-                else:
-                    print(f"      - {description} (无链接重写)")
-
+            with profiler.timer("rule", compiled.description):
+                content, message = compiled.apply(content, file_path_obj, link_rewriter)
+            if message and verbose:
+                log.verbose(MESSAGES[message], compiled.description)
         except Exception as e:
-            print(f"      ❌ {description} - {e}")
+            log.error("      ❌ %s - %s", compiled.description, e)
 
     return content
 
 
-def process_content(config_path, file_path_obj, content, task_rules, link_rewriter=None):
-    matched_groups = []
-
-    if config_path in task_rules:
-        matched_groups.append(task_rules[config_path])
-
-    for pattern, group in task_rules.items():
-        if pattern == config_path:
-            continue
-        if "**" in pattern or "*" in pattern:
-            if "**" in pattern:
-                pattern_base = pattern.split("**")[0].rstrip("/")
-            else:
-                pattern_base = pattern.rsplit("/", 1)[0] if "/" in pattern else ""
-
-            if pattern_base:
-                if config_path.startswith(pattern_base):
-                    matched_groups.append(group)
-            else:
-                if fnmatch.fnmatch(file_path_obj.name, pattern):
-                    matched_groups.append(group)
+def match_rule_groups(config_path, file_path_obj, task_rules):
+    """
+    返回适用于该文件的内容规则组：完全相等的路径优先，其余按配置顺序
+    模式语义见 scripts/glob_index.py
+    """
+    return _as_plan(task_rules).match(config_path)
+
 
+def process_content(config_path, file_path_obj, content, task_rules, link_rewriter=None):
+    matched_groups = match_rule_groups(config_path, file_path_obj, task_rules)
     if not matched_groups:
         return content
 
-    print(f"    🔧 应用 {len(matched_groups)} 组内容规则")
+    log.verbose("    🔧 应用 %d 组内容规则", len(matched_groups))
 
     for group in matched_groups:
-        filters = group.get("filter", [])
-        process_rules = group.get("process", [])
+        with profiler.timer("pattern", group.pattern):
+            if not passes_filters(group.filters, content, verbose=True):
+                log.verbose("      ⏭️ 过滤未通过，跳过该组")
+                continue
 
-        if not passes_filters(filters, content, verbose=True):
-            print(f"      ⏭️ 过滤未通过，跳过该组")
-            continue
-
-        content = apply_process_rules(process_rules, content, file_path_obj, link_rewriter)
+            content = apply_process_rules(group.process, content, file_path_obj, link_rewriter)
 
     return content
 
@@ -128,7 +226,7 @@ def process(task_name: str, ctx: dict):
       - config_path
       - file_path_obj
       - content
-      - task_rules
+      - task_rules（build_task_rules 结果或 TaskRulePlan）
       - link_rewriter（可选）
     """
     return process_content(
@@ -138,5 +236,3 @@ def process(task_name: str, ctx: dict):
         ctx.get("task_rules", {}),
         ctx.get("link_rewriter"),
     )
-
-
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行级源文件内容缓存：同一次运行内每个源文件只读取一次
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from scripts import profiler
+
+DEFAULT_MAX_MB = 256
+
+
+class ContentStore:
+    """
+    按路径缓存源文件文本内容，超出内存上限时按 LRU 淘汰
+    内存占用按字符数近似计算；max_bytes <= 0 表示不缓存
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(file_path):
+        return str(Path(file_path))
+
+    def read(self, file_path):
+        """读取文件内容（utf-8 文本），读取失败时抛出原始异常，不缓存失败结果"""
+        key = self._key(file_path)
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return content
+            self.misses += 1
+
+        with profiler.timer("io", "read"), open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+            if profiler.enabled():
+                profiler.add_bytes("read", os.fstat(f.fileno()).st_size)
+
+        self._put(key, content)
+        return content
+
+    def _put(self, key, content):
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = content
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def __getstate__(self):
+        # 跨进程传递时带上已缓存内容，子进程无需重复读取；统计从零开始
+        with self._lock:
+            return {"max_bytes": self.max_bytes, "entries": list(self._entries.items())}
+
+    def __setstate__(self, state):
+        self.__init__(max_bytes=state["max_bytes"])
+        for key, content in state.get("entries", []):
+            self._put(key, content)
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def merge_stats(self, stats):
+        """汇总子进程的命中统计"""
+        with self._lock:
+            self.hits += stats.get("hits", 0)
+            self.misses += stats.get("misses", 0)
+            self.evictions += stats.get("evictions", 0)
+
+    def invalidate(self, file_path):
+        with self._lock:
+            old = self._entries.pop(self._key(file_path), None)
+            if old is not None:
+                self._size -= len(old)
+
+    def invalidate_under(self, dir_path):
+        """丢弃 dir_path 之下（dir_path 为文件时即该文件）的缓存内容"""
+        prefix = os.path.join(os.path.abspath(dir_path), "")
+        with self._lock:
+            for key in [k for k in self._entries if os.path.abspath(k).startswith(prefix) or os.path.abspath(k) == prefix[:-1]]:
+                self._size -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size": self._size,
+        }
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - store
+      - file_path
+    返回: 文件文本内容
+    """
+    return ctx.get("store").read(ctx.get("file_path"))
@@ -4,10 +4,21 @@
 分发主流程
 """
 
+import contextlib
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
-from scripts import filters
-from scripts.content_rules import build_task_rules, process_content, apply_process_rules
+from scripts import filters, frontmatter, link_resolver, log, profiler
+from scripts.content_rules import (
+    compile_task_rules,
+    compile_process_rules,
+    process_content,
+    apply_process_rules,
+    match_rule_groups,
+)
 from scripts.rename_rules import (
     apply_rename_rule,
     apply_parent_dir_rule,
@@ -16,46 +27,235 @@ from scripts.rename_rules import (
 from scripts.paths import (
     process as paths_process,
     precompute_all_path_mappings,
+    match_source,
 )
-from scripts.link_resolver import process as link_process
+from scripts.link_resolver import process as link_process, iter_link_refs
+from scripts.link_graph import LinkGraph, LINK_GRAPH_FILE
 from scripts.filters import process as filters_process, process_silent as filters_process_silent
 from scripts import settings_gen
+from scripts.content_store import ContentStore, DEFAULT_MAX_MB
+from scripts.walk_cache import WalkCache
+from scripts import fanout as fanout_mod
+from scripts import async_engine
+from scripts import output_cache as output_cache_mod
+from scripts.output_writer import OutputWriter, write_if_changed
+from scripts.manifest import BuildManifest, MANIFEST_FILE, hash_obj, hash_text
 
 
 class Distributor:
-    def __init__(self, workpath: Path, cleanpath, content_rules, tasks, settings_resolver=None):
+    def __init__(
+        self,
+        workpath: Path,
+        cleanpath,
+        content_rules,
+        tasks,
+        settings_resolver=None,
+        content_cache_mb=DEFAULT_MAX_MB,
+        incremental=False,
+        prune=False,
+        jobs=1,
+        file_jobs=1,
+        frontmatter_mode=frontmatter.DEFAULT_MODE,
+        link_resolution=link_resolver.DEFAULT_MODE,
+        profile_path=None,
+        content_store=None,
+        walk_cache=None,
+        plan_cache=None,
+        fanout=None,
+        fanout_jobs=fanout_mod.DEFAULT_JOBS,
+        fanout_link=fanout_mod.DEFAULT_MODE,
+        engine=async_engine.DEFAULT_ENGINE,
+        async_concurrency=async_engine.DEFAULT_CONCURRENCY,
+        output_sink=None,
+        output_cache=None,
+        save_links=False,
+    ):
         self.workpath = Path(workpath)
         self.cleanpath = cleanpath or []
         self.content_rules = content_rules or {}
         self.tasks = tasks or []
         self.path_mappings = {}
         self.settings_resolver = settings_resolver
+        # 批量运行时由多个配置共享内容缓存、目录遍历缓存与已编译规则（plan_cache）
+        self.content_store = content_store if content_store is not None else ContentStore(max_bytes=int(content_cache_mb * 1024 * 1024))
+        self.walk_cache = walk_cache if walk_cache is not None else WalkCache()
+        self.plan_cache = plan_cache
+        # 额外的工作区：主 workpath 的输出物化到这些目录（scripts/fanout.py）
+        self.fanout = [Path(p) for p in fanout or []]
+        self.fanout_jobs = fanout_jobs
+        self.fanout_link = fanout_link
+        self._removed_outputs = []
+        # 输出目标：默认写入 workpath（OutputWriter），也可以是归档等（scripts/archive_sink.py）
+        self.output_writer = output_sink if output_sink is not None else OutputWriter()
+        # 内容寻址的处理结果缓存（scripts/output_cache.py），可由多台机器共享
+        self.output_cache = output_cache
+        self.incremental = incremental
+        self.prune = prune
+        self.manifest = None
+        self.task_plans = {}
+        self.jobs = max(1, int(jobs or 1))
+        self.file_jobs = max(1, int(file_jobs or 1))
+        self.frontmatter_mode = frontmatter_mode
+        self.link_resolution = link_resolution
+        # async 时预计算与文件处理的读写经 asyncio 引擎并发执行（scripts/async_engine.py）
+        self.engine = engine
+        self.async_concurrency = max(1, int(async_concurrency or 1))
+        # 各阶段累计耗时（秒）：compile / precompute / clean / tasks（含 task:<name> 与 settings:<name>）/ finalize / fanout
+        self.timings = {}
+        # 非空时启用剖析（scripts/profiler.py），运行结束输出耗时排行并写出完整 JSON
+        self.profile_path = profile_path
+        # 本次运行的链接依赖图与上次保存的链接图；各 (task, unit, file) 的输出供监听模式使用
+        self.link_graph = LinkGraph()
+        self.previous_links = LinkGraph()
+        self._outputs = {}
+        # 是否保存链接图：增量、清单清理与监听模式依赖它，其余运行只在 --save-link-graph 时保存（供 --links-to 查询）
+        self.save_links = save_links
+        # cancel() 置位后不再开始处理新的文件（库 API 的调用方提前结束时使用）
+        self.cancelled = False
+        # 分发时收集的 settings 元数据: {task_name: {(unit_idx, config_path): permission}}，按处理顺序
+        self._settings_meta = {}
+        self._settings_tasks = {task.get("name", "unnamed") for task in self.tasks if task.get("generate_settings")}
 
     # 基础工具
+    @contextlib.contextmanager
+    def _phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            profiler.add("phase", name, elapsed)
+
     def get_target_path(self, task_name, config_path):
         return self.path_mappings.get(task_name, {}).get(config_path)
 
+    def _collects_settings(self, task_name, dist_rule):
+        """该分发单元的文件是否参与 settings 生成（只统计目录源）"""
+        source_config = dist_rule.get("source")
+        return (
+            self.settings_resolver is not None
+            and task_name in self._settings_tasks
+            and isinstance(source_config, dict)
+            and source_config.get("type") == "directory"
+        )
+
     # 清理
     def clean_targets(self):
         if not self.cleanpath:
             return
-        print(f"\n🧹 清理 {len(self.cleanpath)} 个目标路径...")
+        log.summary("\n🧹 清理 %d 个目标路径...", len(self.cleanpath))
         for path_str in self.cleanpath:
             target = self.workpath / path_str
             if not target.exists():
-                print(f"  ⏭️  {path_str} (不存在，跳过)")
+                log.summary("  ⏭️  %s (不存在，跳过)", path_str)
                 continue
             try:
                 if target.is_file():
                     target.unlink()
-                    print(f"  🗑️  {path_str} (文件)")
+                    log.summary("  🗑️  %s (文件)", path_str)
                 elif target.is_dir():
                     import shutil
 
                     shutil.rmtree(target)
-                    print(f"  🗑️  {path_str} (目录)")
+                    log.summary("  🗑️  %s (目录)", path_str)
             except Exception as e:
-                print(f"  ❌ 删除 {path_str} 失败: {e}")
+                log.error("  ❌ 删除 %s 失败: %s", path_str, e, event="error")
+
+    # 增量构建
+    def _rules_hash(self, task_name, task_rules, dist_rule, file_path, config_path, refs):
+        """
+        单个 (task, file) 的有效规则链哈希：
+        分发单元配置 + 匹配到的内容规则组 + 目标路径 + 文件中各链接所指文件的目标路径
+        只有被链接文件的目标路径变化才会使该文件失效，与目标任务中其他文件无关
+        """
+        groups = [g.raw for g in match_rule_groups(config_path, Path(file_path), task_rules)]
+        link_deps = {}
+        for target_task, ref in refs:
+            link_deps.setdefault(target_task, {})[ref] = self.get_target_path(target_task, ref)
+        return hash_obj(
+            {
+                "dist_rule": dist_rule,
+                "groups": groups,
+                "target": self.get_target_path(task_name, config_path),
+                "link_deps": link_deps,
+            }
+        )
+
+    def _output_cache_key(self, task_rules, dist_rule, file_path, config_path, content, input_hash, refs):
+        """
+        处理结果缓存的键：输入内容 + 匹配到的内容规则组 + 分发单元 process 规则 + 链接所指文件的目标路径
+        链接按源文件目录解析，键中包含该目录（相对路径，与机器无关）；不包含本文件的目标路径与 workpath
+        """
+        link_deps = {}
+        for target_task, ref in refs:
+            link_deps.setdefault(target_task, {})[ref] = self.get_target_path(target_task, ref)
+        return output_cache_mod.cache_key(
+            input_hash or hash_text(content),
+            [g.raw for g in match_rule_groups(config_path, Path(file_path), task_rules)],
+            dist_rule.get("process", []),
+            link_deps,
+            {
+                "source_dir": config_path.rsplit("/", 1)[0] if "/" in config_path else "",
+                "frontmatter": self.frontmatter_mode,
+                "link_resolution": self.link_resolution,
+            },
+        )
+
+    def remove_stale_outputs(self):
+        """删除上次运行产生、本次已无来源的输出文件"""
+        stale = self.manifest.stale_outputs()
+        self._removed_outputs = list(stale)
+        if not stale:
+            return
+        log.summary("\n🧹 清理 %d 个过期输出...", len(stale))
+        for target in stale:
+            self._delete_output(target)
+
+    def _delete_output(self, target):
+        """删除 workpath 下的输出文件，并向上清理变空的目录"""
+        target_path = self.workpath / target
+        try:
+            if target_path.is_file():
+                target_path.unlink()
+                log.verbose("  🗑️  %s", target)
+            parent = target_path.parent
+            while parent != self.workpath and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        except Exception as e:
+            log.error("  ❌ 删除 %s 失败: %s", target, e, event="error")
+
+    # 规则编译
+    def compile_plans(self):
+        """
+        为每个 task 构建内容规则执行计划与分发单元 process 规则
+        无效正则在此处抛出 ValueError，不会等到处理文件时才失败
+        """
+        self.task_plans = {}
+        for task in self.tasks:
+            self._get_plan(task)
+
+    def _get_plan(self, task):
+        task_name = task.get("name", "unnamed")
+        if task_name not in self.task_plans:
+            self.task_plans[task_name] = (
+                self._compiled(("rules", self.content_rules, task_name), lambda: compile_task_rules(self.content_rules, task_name)),
+                [
+                    self._compiled(("process", d.get("process", [])), lambda d=d: compile_process_rules(d.get("process", [])))
+                    for d in task.get("distribute", [])
+                ],
+            )
+        return self.task_plans[task_name]
+
+    def _compiled(self, key, build):
+        """有 plan_cache 时按规则内容的哈希复用编译结果（批量运行中内容相同的规则只编译一次）"""
+        if self.plan_cache is None:
+            return build()
+        key = hash_obj(key)
+        if key not in self.plan_cache:
+            self.plan_cache[key] = build()
+        return self.plan_cache[key]
 
     # 链接重写适配器
     def _make_link_rewriter(self, target_task):
@@ -68,7 +268,8 @@ class Distributor:
         return rewriter
 
     # 分发
-    def distribute_file(self, source_path, content, dist_config):
+    def distribute_file(self, source_path, content, dist_config, write=None, task_name=None):
+        """write: 可选，写出函数 write(path, content, task) -> 是否实际写入，默认 output_writer.write"""
         from scripts.rename_rules import apply_rename_rule, apply_parent_dir_rule
 
         # 确定目标文件名
@@ -96,123 +297,828 @@ class Distributor:
                 parent_name = apply_parent_dir_rule(parent_name, dist_config["rename_rule"])
             target_dir = target_dir / parent_name
 
-        target_dir.mkdir(parents=True, exist_ok=True)
+        # 目录由写出时按需创建（归档等输出目标不在 workpath 中创建目录）
         target_path = target_dir / target_name
         try:
-            with open(target_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            print(f"    📤 {target_name} -> {target_dir.relative_to(self.workpath) if copy_to else '.'}")
+            written = (write or self.output_writer.write)(target_path, content, task=task_name)
+            if log.enabled(log.VERBOSE):
+                target_rel = target_dir.relative_to(self.workpath) if copy_to else "."
+                if written:
+                    log.verbose("    📤 %s -> %s", target_name, target_rel)
+                else:
+                    log.verbose("    ⏸️  %s -> %s (未变化)", target_name, target_rel)
+        except Exception as e:
+            log.error("    ❌ 写入文件失败: %s", e, event="error", path=str(target_path))
+            return None
+        return target_path.relative_to(self.workpath)
+
+    # 单文件流水线：读取 → 过滤 → 内容规则 → 分发 process → 写出
+    def _process_file(self, unit, file_path, config_path, read=None, write=None):
+        """
+        处理单个文件并返回结果摘要，日志直接输出到当前 stdout
+        不修改共享状态（清单、计数），便于在线程池中执行
+        read / write: 可选，读取源文件与写出的函数（asyncio 引擎传入预读内容与异步 I/O 层），默认经内容缓存与 output_writer
+        """
+        task_name, task_rules, dist_idx, dist_rule, dist_process = unit
+        read = read or self.content_store.read
+        input_hash = rules_hash = None
+        # 输入未变时上次的链接即本次的链接
+        prev_refs = self.previous_links.links_of((task_name, dist_idx, config_path))
+        try:
+            if self.manifest:
+                input_hash = self.manifest.input_hash(file_path, read)
+                rules_hash = self._rules_hash(task_name, task_rules, dist_rule, file_path, config_path, prev_refs)
+                if self.incremental and self.manifest.is_fresh(task_name, dist_idx, config_path, input_hash, rules_hash, self.workpath):
+                    return {"status": "fresh", "links": prev_refs, "meta": self._fresh_meta(unit, file_path, config_path)}
+            content = read(file_path)
         except Exception as e:
-            print(f"    ❌ 写入文件失败: {e}")
+            log.error("    ❌ 读取文件失败: %s - %s", file_path, e, event="error", path=str(file_path))
+            return {"status": "error"}
+
+        log.verbose("\n    📝 %s", config_path)
+
+        dist_filters = dist_rule.get("filter", [])
+        if not filters_process(task_name, {"filters": dist_filters, "content": content, "verbose": True}):
+            log.verbose("      ⏭️  过滤未通过，跳过")
+            if self.manifest and prev_refs:
+                rules_hash = self._rules_hash(task_name, task_rules, dist_rule, file_path, config_path, ())
+            return {"status": "filtered", "input_hash": input_hash, "rules_hash": rules_hash, "links": ()}
+
+        def link_rewriter_fn(content_val, file_path_obj, rule):
+            return link_process(
+                task_name,
+                {
+                    "content": content_val,
+                    "file_path_obj": file_path_obj,
+                    "rule": rule,
+                    "resolver": lambda t_name, cfg: self.get_target_path(t_name, cfg),
+                },
+            )
+
+        refs = self._link_refs(task_rules, file_path, config_path, content) if self.tracks_links else set()
+        cache_key = final_content = None
+        if self.output_cache is not None:
+            cache_key = self._output_cache_key(task_rules, dist_rule, file_path, config_path, content, input_hash, refs)
+            final_content = self.output_cache.get(cache_key)
+            if final_content is not None:
+                log.verbose("    ♻️  命中输出缓存，跳过规则处理")
+
+        if final_content is None:
+            processed_content = process_content(
+                config_path,
+                Path(file_path),
+                content,
+                task_rules,
+                link_rewriter_fn,
+            )
+
+            final_content = apply_process_rules(dist_process, processed_content, Path(file_path)) if dist_process else processed_content
+            if cache_key is not None:
+                self.output_cache.put(cache_key, final_content)
+
+        target = self.distribute_file(file_path, final_content, dist_rule, write=write, task_name=task_name)
+        if self.manifest and refs != prev_refs:
+            rules_hash = self._rules_hash(task_name, task_rules, dist_rule, file_path, config_path, refs)
+        meta = None
+        if self._collects_settings(task_name, dist_rule):
+            meta = {"permission": settings_gen.file_permission(content, filters.FRONTMATTER_RE)}
+        return {
+            "status": "processed",
+            "input_hash": input_hash,
+            "rules_hash": rules_hash,
+            "target": target,
+            "output_hash": hash_text(final_content) if self.manifest and target is not None else None,
+            "links": refs,
+            "meta": meta,
+        }
+
+    def _fresh_meta(self, unit, file_path, config_path):
+        """未变化的文件沿用清单中的元数据；旧清单中没有时只读取文件开头的 frontmatter"""
+        task_name, _, dist_idx, dist_rule, _ = unit
+        if not self._collects_settings(task_name, dist_rule):
+            return None
+        if self.manifest.previous_target(task_name, dist_idx, config_path) is None:
+            return None
+        meta = self.manifest.previous_meta(task_name, dist_idx, config_path)
+        if meta is None:
+            meta = {"permission": settings_gen.file_permission(frontmatter.read_header(file_path), filters.FRONTMATTER_RE)}
+        return meta
+
+    def _link_refs(self, task_rules, file_path, config_path, content):
+        """文件中会被 rewrite_links_to_claude 重写的链接: {(target_task, ref_config_path)}"""
+        target_tasks = []
+        for group in match_rule_groups(config_path, Path(file_path), task_rules):
+            for rule in group.raw.get("process", []):
+                if rule.get("operation") == "rewrite_links_to_claude":
+                    target_task = rule.get("target_task", "claude")
+                    if target_task not in target_tasks:
+                        target_tasks.append(target_task)
+        if not target_tasks:
+            return set()
+        refs = iter_link_refs(content, Path(file_path))
+        return {(target_task, ref) for target_task in target_tasks for ref in refs}
+
+    def _apply_outcome(self, unit, config_path, outcome, counts):
+        """在主线程中按文件顺序更新清单与计数"""
+        task_name, _, dist_idx, _, _ = unit
+        status = outcome["status"]
+        if status != "error":
+            self._track_outcome((task_name, dist_idx, config_path), outcome)
+        if status == "fresh":
+            self.manifest.keep(task_name, dist_idx, config_path, outcome.get("meta"))
+            counts["skipped"] += 1
+        elif status == "filtered":
+            if self.manifest:
+                self.manifest.record(task_name, dist_idx, config_path, outcome["input_hash"], outcome["rules_hash"])
+        elif status == "processed":
+            if self.manifest and outcome["target"] is not None:
+                self.manifest.record(
+                    task_name,
+                    dist_idx,
+                    config_path,
+                    outcome["input_hash"],
+                    outcome["rules_hash"],
+                    outcome["target"],
+                    outcome["output_hash"],
+                    outcome["meta"],
+                )
+            counts["processed"] += 1
+
+    def _track_outcome(self, owner, outcome):
+        self.link_graph.set_links(owner, outcome.get("links", ()))
+        task_name, dist_idx, config_path = owner
+        meta = outcome.get("meta")
+        if meta is not None:
+            self._settings_meta.setdefault(task_name, {})[(dist_idx, config_path)] = meta.get("permission")
+        else:
+            self._settings_meta.get(task_name, {}).pop((dist_idx, config_path), None)
+        if outcome["status"] == "fresh":
+            target = self.manifest.previous_target(task_name, dist_idx, config_path)
+        else:
+            target = outcome.get("target")
+        if target is not None:
+            self._outputs[owner] = str(target).replace("\\", "/")
+        else:
+            self._outputs.pop(owner, None)
+
+    def _run_unit_pooled(self, unit, files, counts):
+        """
+        线程池处理一个分发单元内的文件，重叠文件 I/O 等待
+        - 目标路径相同的文件归入同一组顺序执行，保持“后写覆盖”的原有结果
+        - 每个文件的日志在工作线程内缓冲，按原文件顺序整块输出
+        - 同时在途的组数有上限，避免结果无限堆积
+        """
+        _, _, _, dist_rule, _ = unit
+        groups = {}
+        for index, (file_path, config_path) in enumerate(files):
+            target = rename_process(task_name="", ctx={"source_path": file_path, "dist_config": dist_rule})
+            groups.setdefault(target, []).append(index)
+        group_list = list(groups.values())
+        group_of = {}
+        for group_idx, indices in enumerate(group_list):
+            for index in indices:
+                group_of[index] = group_idx
+
+        def run_group(indices):
+            results = {}
+            for index in indices:
+                if self.cancelled:
+                    break
+                file_path, config_path = files[index]
+                with log.capture() as records:
+                    outcome = self._process_file(unit, file_path, config_path)
+                results[index] = (records, outcome)
+            return results
+
+        window = self.file_jobs * 4
+        futures = {}
+        next_group = 0
+        with ThreadPoolExecutor(max_workers=self.file_jobs) as pool:
+            for index in range(len(files)):
+                if self.cancelled:
+                    break
+                while next_group < len(group_list) and next_group < group_of[index] + window:
+                    futures[next_group] = pool.submit(run_group, group_list[next_group])
+                    next_group += 1
+                group_idx = group_of[index]
+                result = futures[group_idx].result().get(index)
+                if result is None:
+                    # 取消时组内剩余的文件未处理
+                    break
+                records, outcome = result
+                if index == group_list[group_idx][-1]:
+                    del futures[group_idx]
+                log.replay(records)
+                self._apply_outcome(unit, files[index][1], outcome, counts)
+            # 取消时丢弃尚未开始的组
+            for future in futures.values():
+                future.cancel()
 
     def run_task(self, task):
         task_name = task.get("name", "unnamed")
-        print(f"\n{'='*60}")
-        print(f"📦 执行任务: {task_name}")
-        print(f"{'='*60}")
+        log.summary("\n%s", "=" * 60)
+        log.summary("📦 执行任务: %s", task_name, event="task_start", task=task_name)
+        log.summary("=" * 60)
 
-        task_rules = build_task_rules(self.content_rules, task_name)
-        print(f"  📐 内容规则数: {sum(len(g.get('process', [])) + len(g.get('filter', [])) for g in task_rules.values())}")
+        task_rules, dist_processes = self._get_plan(task)
+        log.summary("  📐 内容规则数: %d", task_rules.rule_count())
 
         dist_rules = task.get("distribute", [])
-        print(f"  📦 分发单元数: {len(dist_rules)}")
+        log.summary("  📦 分发单元数: %d", len(dist_rules))
 
-        processed_count = 0
-        for dist_idx, dist_rule in enumerate(dist_rules, 1):
-            source_config = dist_rule.get("source")
-            if not source_config:
-                print(f"\n  ⚠️  分发单元 {dist_idx} 缺少 source 配置，跳过")
-                continue
+        counts = {"processed": 0, "skipped": 0}
+        self._settings_meta[task_name] = {}
+        with self._phase(f"task:{task_name}"):
+            for dist_idx, dist_rule in enumerate(dist_rules, 1):
+                if self.cancelled:
+                    break
+                source_config = dist_rule.get("source")
+                if not source_config:
+                    log.summary("\n  ⚠️  分发单元 %d 缺少 source 配置，跳过", dist_idx)
+                    continue
 
-            files = paths_process(task_name, {"source_config": source_config})
-            if not files:
-                print(f"\n  ⏭️  分发单元 {dist_idx}: 无匹配文件")
-                continue
+                files = paths_process(task_name, {"source_config": source_config, "walk_cache": self.walk_cache})
+                if not files:
+                    log.summary("\n  ⏭️  分发单元 %d: 无匹配文件", dist_idx)
+                    continue
 
-            print(f"\n  📁 分发单元 {dist_idx}: {len(files)} 个文件")
+                log.summary("\n  📁 分发单元 %d: %d 个文件", dist_idx, len(files))
 
-            for file_path, config_path in files:
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                except Exception as e:
-                    print(f"    ❌ 读取文件失败: {file_path} - {e}")
-                    continue
+                unit = (task_name, task_rules, dist_idx, dist_rule, dist_processes[dist_idx - 1])
+                if self.engine == "async" and len(files) > 1:
+                    async_engine.run_unit(self, unit, files, counts, self.async_concurrency)
+                elif self.file_jobs > 1 and len(files) > 1:
+                    self._run_unit_pooled(unit, files, counts)
+                else:
+                    for file_path, config_path in files:
+                        if self.cancelled:
+                            break
+                        outcome = self._process_file(unit, file_path, config_path)
+                        self._apply_outcome(unit, config_path, outcome, counts)
+        if self.cancelled:
+            return
+        processed_count = counts["processed"]
+        skipped_count = counts["skipped"]
 
-                print(f"\n    📝 {config_path}")
+        with self._phase(f"settings:{task_name}"):
+            self._update_settings(task)
 
-                dist_filters = dist_rule.get("filter", [])
-                if not filters_process(task_name, {"filters": dist_filters, "content": content, "verbose": True}):
-                    print(f"      ⏭️  过滤未通过，跳过")
-                    continue
+        if self.manifest:
+            self.manifest.mark_completed(task_name, self.workpath)
+        if self.incremental:
+            log.summary(
+                "\n  ✨ 任务 '%s' 完成，处理 %d 个文件，跳过未变化 %d 个",
+                task_name,
+                processed_count,
+                skipped_count,
+                event="task_done",
+                task=task_name,
+                processed=processed_count,
+                skipped=skipped_count,
+            )
+        else:
+            log.summary(
+                "\n  ✨ 任务 '%s' 完成，处理 %d 个文件",
+                task_name,
+                processed_count,
+                event="task_done",
+                task=task_name,
+                processed=processed_count,
+            )
 
-                def link_rewriter_fn(content_val, file_path_obj, rule):
-                    return link_process(
-                        task_name,
-                        {
-                            "content": content_val,
-                            "file_path_obj": file_path_obj,
-                            "rule": rule,
-                            "resolver": lambda t_name, cfg: self.get_target_path(t_name, cfg),
-                        },
-                    )
-
-                processed_content = process_content(
-                    config_path,
-                    Path(file_path),
-                    content,
-                    task_rules,
-                    link_rewriter_fn,
-                )
+    def output_roots(self):
+        """本次运行可能写入或删除的路径：cleanpath、各分发单元的目标目录、settings 文件与 workpath 下的状态文件"""
+        roots = {self.workpath / path_str for path_str in self.cleanpath}
+        for task in self.tasks:
+            for dist_rule in task.get("distribute", []):
+                roots.add(self.workpath / dist_rule.get("copy", ""))
+            settings_cfg = task.get("generate_settings")
+            if settings_cfg:
+                roots.add(self.workpath / settings_cfg.get("target", ".claude/settings.local.json"))
+        roots.add(self.link_graph_path)
+        roots.add(self.workpath / MANIFEST_FILE)
+        return sorted(roots)
 
-                dist_process = dist_rule.get("process", [])
-                final_content = apply_process_rules(dist_process, processed_content, Path(file_path)) if dist_process else processed_content
-
-                self.distribute_file(file_path, final_content, dist_rule)
-                processed_count += 1
-
-        if self.settings_resolver:
-                self.settings_resolver(
-                    task_name=task_name,
-                    ctx={
-                        "task": task,
-                        "workpath": self.workpath,
-                        "default_permission": "allow",
-                        "target_file": ".claude/settings.local.json",
-                        "collect_source": lambda sc: paths_process(task_name, {"source_config": sc}),
-                        "get_target_path": self.get_target_path,
-                        "frontmatter_re": filters.FRONTMATTER_RE,
-                    },
-                )
+    # 链接图
+    @property
+    def link_graph_path(self):
+        return self.workpath / LINK_GRAPH_FILE
 
-        print(f"\n  ✨ 任务 '{task_name}' 完成，处理 {processed_count} 个文件")
+    @property
+    def keeps_link_graph(self):
+        return self.output_writer.materializes and (self.save_links or self.incremental or self.prune)
 
-    def run(self):
-        print("\n" + "=" * 60)
-        print("🚀 通用 LLM 规则分发工具")
-        print("=" * 60)
-        print(f"📂 工作路径: {self.workpath.absolute()}")
-        print(f"📋 任务数量: {len(self.tasks)}")
-
-        self.path_mappings = precompute_all_path_mappings(
-            self.tasks,
-            lambda task_name, ctx: filters_process_silent(task_name, ctx),
-            lambda source_path, dist_config: rename_process(
-                task_name="",
-                ctx={"source_path": source_path, "dist_config": dist_config},
-            ),
+    @property
+    def tracks_links(self):
+        """是否计算文件的链接依赖：保存的链接图（含增量清单与监听模式）与输出缓存键使用，普通运行不扫描"""
+        return self.keeps_link_graph or self.output_cache is not None
+
+    def save_link_graph(self, failed=()):
+        """保存链接图；失败的任务保留上次的链接，保证下次仍能追踪其依赖"""
+        for task_name in failed:
+            for owner, refs in self.previous_links.task_links(task_name).items():
+                if owner not in self.link_graph.forward:
+                    self.link_graph.set_links(owner, refs)
+        try:
+            self.link_graph.save(self.link_graph_path)
+        except Exception as e:
+            log.error("\n❌ 保存链接图失败: %s", e, event="error")
+            return
+        log.summary("\n🔗 链接图: %d 条链接 -> %s", len(self.link_graph), self.link_graph_path, event="link_graph", links=len(self.link_graph))
+
+    def _update_settings(self, task, workpath=None, write_output=None):
+        """workpath / write_output 默认为主 workpath 与 output_writer（fan-out 时为各工作区）"""
+        if not self.settings_resolver:
+            return
+        task_name = task.get("name", "unnamed")
+        self.settings_resolver(
+            task_name=task_name,
+            ctx={
+                "task": task,
+                "workpath": workpath or self.workpath,
+                "default_permission": "allow",
+                "target_file": ".claude/settings.local.json",
+                "collect_source": lambda sc: paths_process(task_name, {"source_config": sc, "walk_cache": self.walk_cache}),
+                "get_target_path": self.get_target_path,
+                "frontmatter_re": filters.FRONTMATTER_RE,
+                "read_content": self.content_store.read,
+                "write_output": write_output or functools.partial(self.output_writer.write, task=task_name),
+                "file_meta": self._settings_file_meta(task_name),
+                "merge_existing": self.output_writer.materializes or write_output is not None,
+            },
         )
-        self.clean_targets()
 
-        for task in self.tasks:
+    def _settings_file_meta(self, task_name):
+        """分发时收集的 [(config_path, permission)]；任务未在本进程执行过时为 None（settings_gen 回退为重新遍历）"""
+        entries = self._settings_meta.get(task_name)
+        if entries is None:
+            return None
+        return [(config_path, permission) for (_, config_path), permission in entries.items()]
+
+    # 多工作区分发
+    def fan_out(self):
+        """
+        主 workpath 的输出物化到各工作区并重新生成其 settings（settings 会合并工作区中已有的内容，不直接共享）
+        非清单模式下各工作区 cleanpath 中不属于本次输出的文件被删除；清单模式下删除本次清理掉的过期输出
+        返回是否全部成功
+        """
+        main = os.path.abspath(self.workpath)
+        workspaces = [p for p in self.fanout if os.path.abspath(p) != main]
+        if not workspaces:
+            return True
+        outputs = sorted(set(self._outputs.values()))
+        log.summary(
+            "\n🌐 分发到 %d 个工作区 (%d 个输出，并行 %d，方式 %s)...",
+            len(workspaces),
+            len(outputs),
+            self._fanout.jobs,
+            self._fanout.mode,
+        )
+
+        def update_settings(workspace):
+            for task in self.tasks:
+                self._update_settings(task, workpath=workspace, write_output=write_if_changed)
+
+        results = self._fanout.run(
+            workspaces,
+            outputs,
+            remove=self._removed_outputs if self.manifest else (),
+            clean_roots=() if self.manifest else self.cleanpath,
+            after_sync=update_settings,
+        )
+        failed = [str(workspace) for workspace, stats in results.items() if stats["errors"]]
+        if failed:
+            log.error("  ❌ %d 个工作区分发失败: %s", len(failed), ", ".join(failed), event="fanout_failed", workspaces=failed)
+        return not failed
+
+    def cancel(self):
+        """请求停止运行：正在处理的文件完成后不再处理新文件，run() 返回 False"""
+        self.cancelled = True
+
+    def check_options(self):
+        """应用进程级解析方式并检查运行选项，无效时抛出 ValueError"""
+        frontmatter.configure(self.frontmatter_mode)
+        link_resolver.configure(self.link_resolution)
+        self._fanout = fanout_mod.FanOut(self.workpath, self.fanout_link, self.fanout_jobs) if self.fanout else None
+        if not self.output_writer.materializes and (self.incremental or self.prune or self.fanout):
+            raise ValueError("输出不写入 workpath 时不支持增量、清单清理与多工作区分发")
+        if self.engine not in async_engine.ENGINES:
+            raise ValueError(f"未知的执行引擎: {self.engine}（可选: {', '.join(async_engine.ENGINES)}）")
+
+    def run(self):
+        log.summary("\n%s", "=" * 60)
+        log.summary("🚀 通用 LLM 规则分发工具")
+        log.summary("=" * 60)
+        log.summary("📂 工作路径: %s", self.workpath.absolute())
+        log.summary("📋 任务数量: %d", len(self.tasks))
+
+        try:
+            self.check_options()
+        except ValueError as e:
+            log.error("\n❌ %s", e, event="error")
+            return False
+
+        self.timings = {}
+        # 缓存可能由批量运行中的多个配置共享，统计只计本次运行
+        self.content_store.reset_stats()
+        self.walk_cache.reset_stats()
+        self.output_writer.reset_stats()
+        if self.output_cache is not None:
+            self.output_cache.reset_stats()
+        profiler.enable(bool(self.profile_path))
+        try:
+            with self._phase("compile"):
+                self.compile_plans()
+        except ValueError as e:
+            log.error("\n❌ 内容规则编译失败: %s", e, event="error")
+            return False
+
+        with self._phase("precompute"):
+            read_header = frontmatter.read_header
+            if self.engine == "async":
+                read_header = async_engine.header_reader(async_engine.prefetch_headers(self.tasks, self.walk_cache, self.async_concurrency))
+            self.path_mappings = precompute_all_path_mappings(
+                self.tasks,
+                lambda task_name, ctx: filters_process_silent(task_name, ctx),
+                lambda source_path, dist_config: rename_process(
+                    task_name="",
+                    ctx={"source_path": source_path, "dist_config": dist_config},
+                ),
+                read_content=read_header,
+                walk_cache=self.walk_cache,
+            )
+        self.link_graph = LinkGraph()
+        self.previous_links = LinkGraph.load(self.link_graph_path)
+
+        with self._phase("clean"):
+            if self.incremental or self.prune:
+                # 增量与清单清理模式依赖上次的输出，不清理 cleanpath，只删除清单中已无来源的输出
+                self.manifest = BuildManifest(self.workpath)
+                if self.incremental:
+                    log.summary("\n♻️  增量模式: 清单 %s", self.manifest.path)
+                else:
+                    log.summary("\n✂️  清单清理模式: 清单 %s", self.manifest.path)
+                if not self.manifest.previous["tasks"]:
+                    log.summary("  ⚠️  未找到上次的清单，本次不删除任何旧输出")
+            else:
+                self.manifest = None
+                if self.output_writer.materializes:
+                    self.clean_targets()
+
+        with self._phase("tasks"):
+            if self.jobs > 1 and len(self.tasks) > 1:
+                failed = self._run_tasks_parallel()
+            else:
+                failed = []
+                for task in self.tasks:
+                    if self.cancelled:
+                        break
+                    if not self._run_task_safe(task):
+                        failed.append(task.get("name", "unnamed"))
+
+        if self.cancelled:
+            # 输出不完整：不保存链接图与清单、不写出归档
+            log.summary("\n⏹️  运行已取消", event="run_cancelled")
+            log.flush()
+            return False
+
+        output_ok = True
+        with self._phase("finalize"):
+            if self.keeps_link_graph:
+                self.save_link_graph(failed)
+            if self.manifest:
+                self.remove_stale_outputs()
+                self.manifest.save()
             try:
-                self.run_task(task)
+                self.output_writer.close()
             except Exception as e:
+                log.error("\n❌ 写出输出失败: %s", e, event="error")
+                output_ok = False
+            if self.output_cache is not None:
+                self.output_cache.prune()
+        fanout_ok = True
+        if self._fanout:
+            with self._phase("fanout"):
+                fanout_ok = self.fan_out()
+        if self.incremental:
+            log.summary(
+                "\n♻️  增量统计: 重新处理 %d，跳过 %d",
+                self.manifest.rebuilt,
+                self.manifest.skipped,
+                event="incremental",
+                rebuilt=self.manifest.rebuilt,
+                skipped=self.manifest.skipped,
+            )
+
+        stats = self.content_store.stats()
+        log.summary(
+            "\n📊 内容缓存: 命中 %d，未命中 %d，淘汰 %d",
+            stats["hits"],
+            stats["misses"],
+            stats["evictions"],
+            event="content_cache",
+            **stats,
+        )
+        write_stats = self.output_writer.stats()
+        log.summary(
+            "💾 输出文件: 写入 %d，未变化 %d",
+            write_stats["written"],
+            write_stats["unchanged"],
+            event="output_writer",
+            **write_stats,
+        )
+        walk_stats = self.walk_cache.stats()
+        log.summary(
+            "📂 目录遍历: %d 次，复用 %d 次",
+            walk_stats["walks"],
+            walk_stats["hits"],
+            event="walk_cache",
+            **walk_stats,
+        )
+        if self.output_cache is not None:
+            cache_stats = self.output_cache.stats()
+            log.summary(
+                "🗄️  输出缓存: 命中 %d，未命中 %d，写入 %d，淘汰 %d",
+                cache_stats["hits"],
+                cache_stats["misses"],
+                cache_stats["stores"],
+                cache_stats["evictions"],
+                event="output_cache",
+                **cache_stats,
+            )
+        if self.profile_path:
+            self.write_profile()
+
+        log.summary("\n%s", "=" * 60)
+        if failed:
+            log.error("❌ %d 个任务失败: %s", len(failed), ", ".join(failed), event="run_done", failed=failed)
+        elif not output_ok:
+            log.error("❌ 任务完成，但写出输出失败", event="run_done", failed=[])
+        elif not fanout_ok:
+            log.error("❌ 任务完成，但部分工作区分发失败", event="run_done", failed=[])
+        else:
+            log.summary("✅ 所有任务完成", event="run_done", failed=[])
+        log.summary("=" * 60)
+        log.flush()
+        return not failed and output_ok and fanout_ok
+
+    def write_profile(self):
+        profiler.report()
+        try:
+            profiler.save(self.profile_path)
+        except Exception as e:
+            log.error("\n❌ 写入剖析数据失败: %s", e, event="error")
+            return
+        log.summary("  📄 完整剖析数据: %s", self.profile_path, event="profile_saved", path=str(self.profile_path))
+
+    def _run_task_safe(self, task):
+        try:
+            self.run_task(task)
+            return True
+        except Exception as e:
+            task_name = task.get("name", "unnamed")
+            log.error("\n❌ 任务 '%s' 执行失败: %s", task_name, e, event="task_failed", task=task_name)
+            return False
+
+    def _run_tasks_parallel(self):
+        """
+        多进程并行执行任务：各任务输出在子进程内缓冲，按配置顺序整体输出
+        增量清单条目与缓存统计回传主进程合并
+        """
+        workers = min(self.jobs, len(self.tasks))
+        log.summary("\n⚡ 并行执行 %d 个任务 (进程数: %d)", len(self.tasks), workers)
+
+        failed = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self, log.get_config())) as pool:
+            futures = [pool.submit(_run_task_worker, task) for task in self.tasks]
+            for task, future in zip(self.tasks, futures):
                 task_name = task.get("name", "unnamed")
-                print(f"\n❌ 任务 '{task_name}' 执行失败: {e}")
+                try:
+                    result = future.result()
+                except Exception as e:
+                    log.error("\n❌ 任务 '%s' 执行失败: %s", task_name, e, event="task_failed", task=task_name)
+                    failed.append(task_name)
+                    continue
+
+                log.replay(result["records"])
+                self.content_store.merge_stats(result["cache_stats"])
+                self.output_writer.merge_stats(result["write_stats"])
+                if self.output_cache is not None:
+                    self.output_cache.merge_stats(result["output_cache_stats"])
+                self.output_writer.merge(result["sink_data"])
+                self.timings.update(result["timings"])
+                profiler.merge(result["profile"])
+                if self.manifest and result["manifest"]:
+                    self.manifest.merge_task(result["manifest"])
+                for owner, refs in result["links"].items():
+                    self.link_graph.set_links(owner, refs)
+                self._outputs.update(result["outputs"])
+                self._settings_meta[task_name] = result["settings_meta"]
+                if not result["ok"]:
+                    failed.append(task_name)
+        return failed
+
+    # 监听模式：按需重新分发
+    def process_changes(self, changed_paths):
+        """
+        在一次完整 run() 之后，只处理发生变化的源文件：
+        - 同步目录遍历缓存与内容缓存，重算所属任务中这些文件的路径映射
+        - 仍存在的文件重新处理；已删除或不再通过过滤的文件删除其输出
+          （同一目标仍由其他文件写入时保留）
+        - 路径映射发生变化时，经链接图找到链接指向它的文件一并重新处理
+        返回重新处理的文件数
+        """
+        start = time.monotonic()
+        # 清单已在首次运行结束时保存，监听期间不再维护
+        self.manifest = None
+        # 符号链接与目录可能已变化，链接解析缓存重新建立
+        link_resolver.reset()
+        changed = self._expand_changes(changed_paths)
+        for path in changed:
+            self.walk_cache.update_file(path, os.path.isfile(path))
+
+        tasks_by_name = {task.get("name", "unnamed"): task for task in self.tasks}
+        work = {}
+        removed = []
+        affected = []
+        for task_name, task in tasks_by_name.items():
+            mapping = self.path_mappings.setdefault(task_name, {})
+            for path in changed:
+                exists = os.path.isfile(path)
+                new_targets = {}
+                for dist_idx, dist_rule in enumerate(task.get("distribute", []), 1):
+                    source_config = dist_rule.get("source")
+                    matched = match_source(source_config, path) if source_config else None
+                    if matched is None:
+                        continue
+                    file_path, config_path = matched
+                    self.content_store.invalidate(file_path)
+                    if task_name not in affected:
+                        affected.append(task_name)
+                    owner = (task_name, dist_idx, config_path)
+                    if exists:
+                        work[owner] = file_path
+                    else:
+                        removed.append(owner)
+                    # 与预计算一致：多个分发单元命中同一文件时，最后一个通过过滤的单元决定映射
+                    if exists and self._passes_dist_filters(task_name, dist_rule, file_path):
+                        new_targets[config_path] = rename_process(task_name="", ctx={"source_path": file_path, "dist_config": dist_rule})
+                    else:
+                        new_targets.setdefault(config_path, None)
+
+                for config_path, target in new_targets.items():
+                    if mapping.get(config_path) == target:
+                        continue
+                    if target is None:
+                        mapping.pop(config_path, None)
+                    else:
+                        mapping[config_path] = target
+                    for owner in self.link_graph.dependents(task_name, config_path):
+                        work.setdefault(owner, Path(owner[2]))
+
+        # 多个文件写入同一目标时按原顺序整组重新处理，保持“后写覆盖”的结果
+        writers = {}
+        for owner, target in self._outputs.items():
+            writers.setdefault(target, []).append(owner)
+        targets = set()
+        for owner in removed:
+            targets.add(self._outputs.get(owner))
+        for owner, file_path in work.items():
+            task_name, dist_idx, _ = owner
+            targets.add(self._outputs.get(owner))
+            dist_rule = tasks_by_name[task_name]["distribute"][dist_idx - 1]
+            targets.add(rename_process(task_name="", ctx={"source_path": file_path, "dist_config": dist_rule}))
+        for target in targets:
+            for owner in writers.get(target, ()):
+                if owner not in removed:
+                    work.setdefault(owner, Path(owner[2]))
+
+        deleted = 0
+        for owner in removed:
+            self.link_graph.remove(owner)
+            self._settings_meta.get(owner[0], {}).pop(owner[1:], None)
+            deleted += self._remove_owner_output(owner)
+
+        order = {task_name: idx for idx, task_name in enumerate(tasks_by_name)}
+        counts = {"processed": 0, "skipped": 0}
+        for owner in sorted(work, key=lambda o: (order.get(o[0], len(order)), o[1], o[2].split("/"))):
+            task_name, dist_idx, config_path = owner
+            file_path = work[owner]
+            if task_name not in tasks_by_name or not os.path.isfile(file_path):
+                continue
+            task = tasks_by_name[task_name]
+            task_rules, dist_processes = self._get_plan(task)
+            unit = (task_name, task_rules, dist_idx, task["distribute"][dist_idx - 1], dist_processes[dist_idx - 1])
+            outcome = self._process_file(unit, file_path, config_path)
+            if outcome["status"] == "filtered":
+                deleted += self._remove_owner_output(owner)
+            self._apply_outcome(unit, config_path, outcome, counts)
+
+        for task_name in affected:
+            # 新增的文件排在末尾，按完整运行的处理顺序（分发单元、目录遍历顺序）重排
+            entries = self._settings_meta.get(task_name)
+            if entries:
+                self._settings_meta[task_name] = dict(sorted(entries.items(), key=lambda item: (item[0][0], item[0][1].split("/"))))
+            self._update_settings(tasks_by_name[task_name])
+        if (work or removed) and self.keeps_link_graph:
+            self.save_link_graph()
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+        log.summary(
+            "\n🔁 变化 %d 个文件，重新处理 %d 个，删除输出 %d 个 (%.0f ms)",
+            len(changed),
+            counts["processed"],
+            deleted,
+            elapsed_ms,
+            event="rebuild",
+            changed=len(changed),
+            processed=counts["processed"],
+            removed=deleted,
+            elapsed_ms=round(elapsed_ms, 1),
+        )
+        log.flush()
+        return counts["processed"]
+
+    def _expand_changes(self, changed_paths):
+        """
+        变化的目录展开为其下的文件（包括已缓存但已被移走或删除的文件）
+        本工具自己写出的输出文件不视为源变化，避免源目录包含 workpath 时循环触发
+        """
+        outputs = {os.path.abspath(self.workpath / target) for target in self._outputs.values()}
+        changed = set()
+        for path in changed_paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                for dirpath, _, filenames in os.walk(path):
+                    changed.update(os.path.join(dirpath, name) for name in filenames)
+                changed.update(self.walk_cache.known_files_under(path))
+            else:
+                changed.add(path)
+                if not os.path.exists(path):
+                    changed.update(self.walk_cache.known_files_under(path))
+        return sorted(changed - outputs)
+
+    def _passes_dist_filters(self, task_name, dist_rule, file_path):
+        dist_filters = dist_rule.get("filter", [])
+        if not dist_filters:
+            return True
+        try:
+            content = self.content_store.read(file_path)
+        except Exception:
+            return False
+        return filters_process_silent(task_name, {"filters": dist_filters, "content": content, "verbose": False})
+
+    def _remove_owner_output(self, owner):
+        """删除该 (task, unit, file) 的输出，返回是否实际删除"""
+        target = self._outputs.pop(owner, None)
+        if not target or target in self._outputs.values():
+            return False
+        self._delete_output(target)
+        return True
+
+
+_worker_distributor = None
+
+
+def _init_worker(distributor, log_config):
+    """子进程初始化：每个进程只接收一次 Distributor（含路径映射、已编译规则和内容缓存）"""
+    global _worker_distributor
+    _worker_distributor = distributor
+    log.configure(**log_config)
+    frontmatter.configure(distributor.frontmatter_mode)
+    link_resolver.configure(distributor.link_resolution)
+
+
+def _run_task_worker(task):
+    """子进程入口：执行单个任务并返回缓冲的输出"""
+    distributor = _worker_distributor
+    # 同一进程可能执行多个任务，统计只回传本任务的部分
+    distributor.content_store.reset_stats()
+    distributor.output_writer.reset_stats()
+    if distributor.output_cache is not None:
+        distributor.output_cache.reset_stats()
+    distributor.timings = {}
+    profiler.enable(bool(distributor.profile_path))
+    if distributor.manifest:
+        distributor.manifest.skipped = 0
+        distributor.manifest.rebuilt = 0
 
-        print("\n" + "=" * 60)
-        print("✅ 所有任务完成")
-        print("=" * 60)
+    with log.capture() as records:
+        ok = distributor._run_task_safe(task)
+    task_name = task.get("name", "unnamed")
+    return {
+        "ok": ok,
+        "records": records,
+        "cache_stats": distributor.content_store.stats(),
+        "write_stats": distributor.output_writer.stats(),
+        "output_cache_stats": distributor.output_cache.stats() if distributor.output_cache is not None else None,
+        "sink_data": distributor.output_writer.export(),
+        "timings": distributor.timings,
+        "profile": profiler.export() if distributor.profile_path else None,
+        "manifest": distributor.manifest.export_task(task_name) if distributor.manifest else None,
+        "links": distributor.link_graph.task_links(task_name),
+        "outputs": {owner: target for owner, target in distributor._outputs.items() if owner[0] == task_name},
+        "settings_meta": distributor._settings_meta.get(task_name, {}),
+    }
 
 
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多工作区分发（fan-out）：主 workpath 中的输出只计算一次，再物化到其他工作区
+
+物化方式（--fanout-link）:
+  auto     - 依次尝试 reflink、硬链接，都不支持时复制（默认）
+  reflink  - 写时复制克隆（Linux FICLONE），不支持时复制
+  hardlink - 硬链接，跨设备等不支持时复制
+  copy     - 始终复制
+
+每个工作区记住已失败的方式，不再逐文件重试；工作区之间以有界线程池并行
+"""
+
+import errno
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from scripts import log
+from scripts.output_writer import _file_digest
+
+MODES = ("auto", "reflink", "hardlink", "copy")
+DEFAULT_MODE = "auto"
+DEFAULT_JOBS = 4
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+_METHODS = {
+    "auto": ("reflink", "hardlink", "copy"),
+    "reflink": ("reflink", "copy"),
+    "hardlink": ("hardlink", "copy"),
+    "copy": ("copy",),
+}
+
+
+def _tmp_path(path):
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink 不可用")
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def _hardlink(src, dst):
+    os.link(src, dst)
+
+
+def _copy(src, dst):
+    shutil.copyfile(src, dst)
+
+
+_MATERIALIZE = {"reflink": _reflink, "hardlink": _hardlink, "copy": _copy}
+
+
+def _remove_file(root, path):
+    """删除 root 下的文件，并向上清理变空的目录"""
+    try:
+        if path.is_file() or path.is_symlink():
+            path.unlink()
+        parent = path.parent
+        while parent != root and parent.is_dir() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+    except OSError as e:
+        log.error("    ❌ 删除 %s 失败: %s", path, e, event="error", path=str(path))
+        return False
+    return True
+
+
+class FanOut:
+    """
+    source_root 中的输出（相对路径）物化到各工作区
+    源文件的摘要每个输出只计算一次，供各工作区判断是否未变化
+    """
+
+    def __init__(self, source_root, mode=DEFAULT_MODE, jobs=DEFAULT_JOBS):
+        if mode not in MODES:
+            raise ValueError(f"未知的 fan-out 方式: {mode}（可选: {', '.join(MODES)}）")
+        self.source_root = Path(source_root)
+        self.mode = mode
+        self.jobs = max(1, int(jobs or 1))
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    def _digest(self, rel):
+        with self._lock:
+            digest = self._digests.get(rel)
+        if digest is None:
+            digest = _file_digest(self.source_root / rel)
+            with self._lock:
+                self._digests[rel] = digest
+        return digest
+
+    def _unchanged(self, src, dst, rel):
+        try:
+            dst_stat = os.stat(dst)
+        except OSError:
+            return False
+        src_stat = os.stat(src)
+        if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+            return True
+        return src_stat.st_size == dst_stat.st_size and _file_digest(dst) == self._digest(rel)
+
+    def _materialize(self, src, dst, methods):
+        """写入临时文件后原子替换；返回使用的方式，失败的方式从 methods 中移除"""
+        tmp = _tmp_path(dst)
+        while True:
+            method = methods[0]
+            try:
+                _MATERIALIZE[method](src, tmp)
+                os.replace(tmp, dst)
+                return method
+            except OSError:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                if len(methods) == 1:
+                    raise
+                methods.pop(0)
+
+    def sync(self, workspace, outputs, remove=(), clean_roots=()):
+        """
+        outputs: 需要物化的输出（相对路径）；remove: 需要删除的旧输出
+        clean_roots: 这些路径下不属于 outputs 的文件一并删除（与主 workpath 运行前清空 cleanpath 的结果一致）
+        返回统计 {reflink, hardlink, copy, unchanged, removed, errors}
+        """
+        workspace = Path(workspace)
+        stats = dict.fromkeys(("reflink", "hardlink", "copy", "unchanged", "removed", "errors"), 0)
+        methods = list(_METHODS[self.mode])
+        wanted = set(outputs)
+
+        for rel in sorted(remove):
+            if rel not in wanted and (workspace / rel).is_file() and _remove_file(workspace, workspace / rel):
+                stats["removed"] += 1
+        for root in clean_roots:
+            root_path = workspace / root
+            if root_path.is_file():
+                candidates = [root_path]
+            elif root_path.is_dir():
+                candidates = [Path(dirpath) / name for dirpath, _, names in os.walk(root_path) for name in names]
+            else:
+                continue
+            for path in sorted(candidates):
+                if path.relative_to(workspace).as_posix() not in wanted and _remove_file(workspace, path):
+                    stats["removed"] += 1
+
+        for rel in sorted(wanted):
+            src = self.source_root / rel
+            dst = workspace / rel
+            try:
+                if self._unchanged(src, dst, rel):
+                    stats["unchanged"] += 1
+                    continue
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                stats[self._materialize(src, dst, methods)] += 1
+            except OSError as e:
+                stats["errors"] += 1
+                log.error("    ❌ %s -> %s 失败: %s", rel, workspace, e, event="error", path=str(dst))
+        return stats
+
+    def run(self, workspaces, outputs, remove=(), clean_roots=(), after_sync=None):
+        """
+        并行同步各工作区，日志按工作区顺序输出
+        after_sync(workspace): 同步后在同一线程中执行（如重新生成该工作区的 settings）
+        返回 {workspace: stats}
+        """
+
+        def run_one(workspace):
+            with log.capture() as records:
+                stats = self.sync(workspace, outputs, remove, clean_roots)
+                if after_sync:
+                    try:
+                        after_sync(workspace)
+                    except Exception as e:
+                        stats["errors"] += 1
+                        log.error("    ❌ %s: %s", workspace, e, event="error")
+            return records, stats
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.jobs, max(1, len(workspaces)))) as pool:
+            futures = [(workspace, pool.submit(run_one, workspace)) for workspace in workspaces]
+            for workspace, future in futures:
+                records, stats = future.result()
+                log.replay(records)
+                log.summary(
+                    "  📂 %s: reflink %d，硬链接 %d，复制 %d，未变化 %d，删除 %d%s",
+                    workspace,
+                    stats["reflink"],
+                    stats["hardlink"],
+                    stats["copy"],
+                    stats["unchanged"],
+                    stats["removed"],
+                    f"，失败 {stats['errors']}" if stats["errors"] else "",
+                    event="fanout_workspace",
+                    workspace=str(workspace),
+                    **stats,
+                )
+                results[workspace] = stats
+        return results
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - source_root
+      - workspaces
+      - outputs
+      - mode（可选）/ jobs（可选）
+    返回: {workspace: stats}
+    """
+    fanout = FanOut(ctx.get("source_root"), ctx.get("mode", DEFAULT_MODE), ctx.get("jobs", DEFAULT_JOBS))
+    return fanout.run(ctx.get("workspaces", []), ctx.get("outputs", []))
@@ -4,30 +4,21 @@
 过滤器原子操作
 """
 
-import re
+from scripts import frontmatter, log
+from scripts.frontmatter import FRONTMATTER_RE
 
-FRONTMATTER_RE = re.compile(r"^---\s*\n([\s\S]*?)\n---\s*\n", re.MULTILINE)
 
-
-def _frontmatter_has(content, fields, value=None):
-    m = FRONTMATTER_RE.match(content)
-    if not m:
+def _frontmatter_has(meta, fields, value=None):
+    """meta 为 frontmatter.parse 的结果（无 frontmatter 时为 None）"""
+    if meta is None:
         return False
-    fm_body = m.group(1)
 
     # 如果指定了 value，检查字段值是否匹配
     if value is not None and len(fields) == 1:
-        field = fields[0]
-        pattern = rf"^{re.escape(field)}\s*:\s*(.+?)$"
-        match = re.search(pattern, fm_body, flags=re.MULTILINE)
-        if not match:
-            return False
-        actual_value = match.group(1).strip()
-        return actual_value == value
+        return meta.value(fields[0]) == value
 
     # 否则只检查字段是否存在
-    missing = [f for f in fields if re.search(rf"^{re.escape(f)}\s*:", fm_body, flags=re.MULTILINE) is None]
-    return len(missing) == 0
+    return meta.has(fields)
 
 
 def passes_filters(filters, content, verbose=True):
@@ -35,6 +26,8 @@ def passes_filters(filters, content, verbose=True):
     if not filters:
         return True
 
+    verbose = verbose and log.enabled(log.VERBOSE)
+    meta = frontmatter.parse(content)
     for i, rule in enumerate(filters, 1):
         operation = rule.get("operation")
         description = rule.get("description", f"过滤 {i}")
@@ -46,7 +39,7 @@ def passes_filters(filters, content, verbose=True):
         if operation == "frontmatter_has":
             fields = rule.get("fields", ["name", "description"])
             value = rule.get("value")
-            passed = _frontmatter_has(content, fields, value=value)
+            passed = _frontmatter_has(meta, fields, value=value)
             if not passed:
                 if value is not None:
                     reason = f"字段值不匹配 (期望: {value})"
@@ -54,7 +47,7 @@ def passes_filters(filters, content, verbose=True):
                     reason = "无frontmatter或缺字段"
         else:
             if verbose:
-                print(f"      - {description} (未知过滤类型: {operation})")
+                log.verbose("      - %s (未知过滤类型: %s)", description, operation)
             return False
 
         if negate:
@@ -64,11 +57,11 @@ def passes_filters(filters, content, verbose=True):
 
         if not passed:
             if verbose:
-                print(f"      - {description} ({reason})")
+                log.verbose("      - %s (%s)", description, reason)
             return False
         else:
             if verbose:
-                print(f"      ✓ {description}")
+                log.verbose("      ✓ %s", description)
 
     return True
 
@@ -77,6 +70,7 @@ def passes_filters_silent(filters, content):
     """静默版过滤检查"""
     if not filters:
         return True
+    meta = frontmatter.parse(content)
     for rule in filters:
         operation = rule.get("operation")
         negate = rule.get("negate", False)
@@ -85,7 +79,7 @@ def passes_filters_silent(filters, content):
         if operation == "frontmatter_has":
             fields = rule.get("fields", ["name", "description"])
             value = rule.get("value")
-            passed = _frontmatter_has(content, fields, value=value)
+            passed = _frontmatter_has(meta, fields, value=value)
         else:
             return False
 
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+frontmatter 解析：每段 frontmatter 只解析一次，过滤器与 settings 生成都从解析结果中按字段查找
+
+模式:
+  simple - 逐行解析顶层 `key: value`（默认，与原先的正则判断一致）
+  yaml   - 使用 PyYAML 的 safe_load（可选依赖，需要 pip install pyyaml）
+"""
+
+import codecs
+import io
+import mmap
+import re
+from functools import lru_cache
+
+from scripts import profiler
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - 可选依赖
+    yaml = None
+
+FRONTMATTER_RE = re.compile(r"^---\s*\n([\s\S]*?)\n---\s*\n", re.MULTILINE)
+
+MODES = ("simple", "yaml")
+DEFAULT_MODE = "simple"
+
+_mode = DEFAULT_MODE
+
+
+class Frontmatter:
+    """
+    解析后的 frontmatter：fields 为 {字段: 值}
+    value(field) 返回用于比较的字符串值，字段不存在或没有值时返回 None
+    """
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def has(self, fields):
+        return all(field in self.fields for field in fields)
+
+    def value(self, field):
+        return _as_text(self.fields.get(field))
+
+    def get(self, field, default=None):
+        return self.fields.get(field, default)
+
+
+def _as_text(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value).strip()
+
+
+def _parse_simple(body):
+    """
+    顶层字段逐行解析，字段名须位于行首
+    与原正则 ^field\\s*:\\s*(.+?)$ 保持一致：同名字段取第一次出现；
+    冒号后为空时取下一个非空行，其后只剩空白时值为空字符串，什么都没有时视为无值
+    """
+    fields = {}
+    pending = {}
+    for line in body.split("\n"):
+        if pending:
+            if line.strip():
+                for key in pending:
+                    fields[key] = line.strip()
+                pending = {}
+            elif line:
+                pending = dict.fromkeys(pending, True)
+        if not line or line[0].isspace() or ":" not in line:
+            continue
+        key, rest = line.split(":", 1)
+        key = key.rstrip()
+        if not key or key in fields or key in pending:
+            continue
+        if rest.strip():
+            fields[key] = rest.strip()
+        else:
+            pending[key] = bool(rest)
+    for key, has_space in pending.items():
+        fields[key] = "" if has_space else None
+    return fields
+
+
+def _parse_yaml(body):
+    try:
+        data = yaml.safe_load(body)
+    except yaml.YAMLError:
+        return _parse_simple(body)
+    if not isinstance(data, dict):
+        return {}
+    return {str(key): value for key, value in data.items()}
+
+
+@lru_cache(maxsize=4096)
+def _parse_body(body, mode):
+    if mode == "yaml":
+        return Frontmatter(_parse_yaml(body))
+    return Frontmatter(_parse_simple(body))
+
+
+def configure(mode=None):
+    """设置解析模式；yaml 模式在未安装 PyYAML 时抛出 ValueError"""
+    global _mode
+    mode = mode or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f"未知的 frontmatter 模式: {mode}（可选: {', '.join(MODES)}）")
+    if mode == "yaml" and yaml is None:
+        raise ValueError("frontmatter yaml 模式需要安装 PyYAML: pip install pyyaml")
+    _mode = mode
+
+
+def get_mode():
+    return _mode
+
+
+def parse(content, regex=FRONTMATTER_RE):
+    """返回 Frontmatter；内容没有 frontmatter 时返回 None。结果按 frontmatter 文本缓存"""
+    m = regex.match(content)
+    if not m:
+        return None
+    return _parse_body(m.group(1), _mode)
+
+
+_OPEN_RE = re.compile(r"---\s*")
+# 原始字节中可能的闭合分隔行：换行（\n、\r\n 或 \r）后的 ---
+_CLOSE_CANDIDATE_RE = re.compile(rb"[\r\n]---")
+HEADER_CHUNK = 4096
+# 按块读取的上限（字符），超过后改为 mmap 定位闭合分隔行
+HEADER_LIMIT = 64 * 1024
+
+
+def _header_complete(text):
+    """
+    已读到的开头是否足以确定 parse() 的结果：
+    开头不是 `---` 加空白换行时没有 frontmatter；否则开头的空白须已读完，
+    且按最长的起始分隔（正则优先尝试）已匹配到闭合的 `---` 行
+    """
+    if text[:3] != "---"[: len(text[:3])]:
+        return True
+    m = _OPEN_RE.match(text)
+    if m is None or m.end() == len(text):
+        return False
+    run = text[3 : m.end()]
+    if "\n" not in run:
+        return True
+    matched = FRONTMATTER_RE.match(text)
+    return matched is not None and matched.start(1) == 3 + run.rindex("\n") + 1
+
+
+def _read_header_mmap(f, fallback):
+    """
+    大文件：在 mmap 上查找可能的闭合分隔行，只解码到该处为止，不把整个文件读入内存
+    解码方式与文本模式读取一致（utf-8，通用换行），没有可确定结果的闭合分隔行时返回已读到的较长开头
+    """
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = ""
+        pos = 0
+        for candidate in _CLOSE_CANDIDATE_RE.finditer(mm):
+            cut = candidate.end()
+            # 读到 --- 之后第一个非行内空白字节；\r 之后再多读一个完整字符，换行不会滞留在解码器中
+            while cut < len(mm) and mm[cut] in b" \t\f\v":
+                cut += 1
+            if mm[cut : cut + 1] == b"\r":
+                cut += 1
+            cut += 1
+            while cut < len(mm) and mm[cut] & 0xC0 == 0x80:
+                cut += 1
+            cut = min(cut, len(mm))
+            if cut <= pos:
+                continue
+            text += decoder.decode(mm[pos:cut], final=cut == len(mm))
+            pos = cut
+            if _header_complete(text):
+                return text
+    return text if len(text) > len(fallback) else fallback
+
+
+def read_header(file_path, chunk_size=HEADER_CHUNK, limit=HEADER_LIMIT):
+    """
+    只读取文件开头的 frontmatter 部分，读到足以确定解析结果即停止
+    返回的文本交给 parse() 与读取整个文件的结果一致，内存与 I/O 只与 frontmatter 大小相关：
+    先按块读取（每次读取量翻倍），超过 limit 仍未确定时改为 mmap 定位闭合分隔行
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        with profiler.timer("io", "read_header"):
+            text = f.read(chunk_size)
+            while not _header_complete(text):
+                if len(text) >= limit:
+                    try:
+                        text = _read_header_mmap(f, text)
+                    except (OSError, ValueError):
+                        text += f.read()
+                    break
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                text += chunk
+                chunk_size *= 2
+        if profiler.enabled():
+            profiler.add_bytes("read", len(text.encode("utf-8")))
+    return text
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - content
+    返回: {字段: 值}，没有 frontmatter 时返回 None
+    """
+    meta = parse(ctx.get("content", ""))
+    return dict(meta.fields) if meta is not None else None
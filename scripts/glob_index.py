@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+glob 模式索引：按字面前缀目录建前缀树，叶子上挂编译好的整路径正则
+
+模式语义（路径统一使用 / 分隔）:
+  - 不含通配符: 与路径完全相等
+  - 含 / 的通配模式: 匹配完整路径；`**` 匹配零或多级目录，`*`/`?`/`[...]` 不跨越 /
+  - 不含 / 的通配模式: 匹配文件名（如 `*.md`）
+"""
+
+import re
+from functools import lru_cache
+
+GLOB_CHARS = "*?["
+
+
+def is_glob(pattern):
+    return any(c in pattern for c in GLOB_CHARS)
+
+
+def _normalize(pattern):
+    pattern = pattern.replace("\\", "/")
+    while pattern.startswith("./"):
+        pattern = pattern[2:]
+    return pattern
+
+
+def _translate_segment(segment):
+    """单个路径段的通配符翻译，结果不会匹配 /"""
+    i, n = 0, len(segment)
+    out = []
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == "*":
+            while i < n and segment[i] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and segment[j] in "!^":
+                j += 1
+            if j < n and segment[j] == "]":
+                j += 1
+            while j < n and segment[j] != "]":
+                j += 1
+            if j >= n:
+                out.append("\\[")
+                continue
+            body = segment[i:j].replace("\\", "\\\\")
+            i = j + 1
+            if body[0] in "!^":
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def translate(pattern):
+    """将 glob 模式翻译为匹配完整路径的正则表达式字符串"""
+    segments = _normalize(pattern).split("/")
+    parts = []
+    last = len(segments) - 1
+    for idx, segment in enumerate(segments):
+        if segment == "**":
+            parts.append(".*" if idx == last else "(?:[^/]+/)*")
+            continue
+        parts.append(_translate_segment(segment))
+        if idx != last:
+            parts.append("/")
+    return "(?s:" + "".join(parts) + ")\\Z"
+
+
+@lru_cache(maxsize=1024)
+def compile_glob(pattern):
+    return re.compile(translate(pattern))
+
+
+def literal_prefix(pattern):
+    """模式开头不含通配符的目录段"""
+    segments = _normalize(pattern).split("/")
+    prefix = []
+    for segment in segments[:-1]:
+        if is_glob(segment):
+            break
+        prefix.append(segment)
+    return prefix
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+
+class GlobIndex:
+    """
+    add(pattern, value) 后通过 match(path) 取回所有匹配模式的 value，保持添加顺序
+    完全相等的模式优先返回，其余按添加顺序
+    查询只访问路径所在目录链上的前缀树节点，与模式总数基本无关
+    """
+
+    def __init__(self):
+        self._exact = {}
+        self._root = _TrieNode()
+        self._basename = []
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, pattern, value):
+        order = self._count
+        self._count += 1
+        norm = _normalize(pattern)
+
+        if not is_glob(norm):
+            self._exact.setdefault(norm, []).append((order, value))
+            return
+
+        if "/" not in norm:
+            self._basename.append((order, re.compile(translate(norm)), value))
+            return
+
+        node = self._root
+        for segment in literal_prefix(norm):
+            node = node.children.setdefault(segment, _TrieNode())
+        node.entries.append((order, re.compile(translate(norm)), value))
+
+    def match(self, path):
+        path = _normalize(path)
+        exact = self._exact.get(path, [])
+
+        candidates = []
+        segments = path.split("/")
+        node = self._root
+        for segment in segments:
+            candidates.extend(node.entries)
+            node = node.children.get(segment)
+            if node is None:
+                break
+
+        matched = [(order, value) for order, regex, value in candidates if regex.match(path)]
+
+        if self._basename:
+            name = segments[-1]
+            matched.extend((order, value) for order, regex, value in self._basename if regex.match(name))
+
+        matched.sort(key=lambda item: item[0])
+        return [value for _, value in exact] + [value for _, value in matched]
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - patterns: {pattern: value}
+      - path
+    返回: 匹配到的 value 列表
+    """
+    index = GlobIndex()
+    for pattern, value in ctx.get("patterns", {}).items():
+        index.add(pattern, value)
+    return index.match(ctx.get("path", ""))
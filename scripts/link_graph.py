@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链接依赖图：记录哪些文件的输出依赖其他文件的目标路径（rewrite_links_to_claude）
+每次运行结束后保存到 workpath 下，供增量构建与 --links-to 查询使用
+"""
+
+import json
+import os
+from pathlib import Path
+
+LINK_GRAPH_FILE = ".llm_link_graph.json"
+LINK_GRAPH_VERSION = 1
+
+
+class LinkGraph:
+    """
+    节点:
+      owner = (task_name, unit_idx, config_path)  被处理、其输出包含重写链接的文件
+      ref   = (target_task, ref_config_path)      链接指向的文件及解析目标路径所用的任务
+    forward: owner -> {ref}
+    reverse: ref   -> {owner}
+    ref 在 target_task 中的目标路径变化时，reverse[ref] 中的 owner 需要重新处理
+    """
+
+    def __init__(self):
+        self.forward = {}
+        self.reverse = {}
+
+    def set_links(self, owner, refs):
+        """替换 owner 的全部出边"""
+        refs = set(refs)
+        old = self.forward.get(owner, set())
+        for ref in old - refs:
+            owners = self.reverse.get(ref)
+            if owners is not None:
+                owners.discard(owner)
+                if not owners:
+                    del self.reverse[ref]
+        for ref in refs - old:
+            self.reverse.setdefault(ref, set()).add(owner)
+        if refs:
+            self.forward[owner] = refs
+        else:
+            self.forward.pop(owner, None)
+
+    def remove(self, owner):
+        self.set_links(owner, ())
+
+    def links_of(self, owner):
+        return set(self.forward.get(owner, ()))
+
+    def dependents(self, target_task, ref_config_path):
+        return set(self.reverse.get((target_task, ref_config_path), ()))
+
+    def referrers(self, ref_config_path):
+        """链接指向 ref_config_path 的全部 (owner, target_task)，不区分解析所用任务"""
+        found = []
+        for (target_task, ref), owners in self.reverse.items():
+            if ref == ref_config_path:
+                found.extend((owner, target_task) for owner in owners)
+        return sorted(found)
+
+    def task_links(self, task_name):
+        return {owner: set(refs) for owner, refs in self.forward.items() if owner[0] == task_name}
+
+    def __len__(self):
+        return sum(len(refs) for refs in self.forward.values())
+
+    # 持久化
+    def to_dict(self):
+        tasks = {}
+        for (task_name, unit_idx, config_path), refs in sorted(self.forward.items()):
+            units = tasks.setdefault(task_name, {})
+            units.setdefault(str(unit_idx), {})[config_path] = sorted([list(ref) for ref in refs])
+        return {"version": LINK_GRAPH_VERSION, "tasks": tasks}
+
+    @classmethod
+    def from_dict(cls, data):
+        graph = cls()
+        if data.get("version") != LINK_GRAPH_VERSION:
+            return graph
+        for task_name, units in data.get("tasks", {}).items():
+            for unit_idx, entries in units.items():
+                for config_path, refs in entries.items():
+                    graph.set_links((task_name, int(unit_idx), config_path), [tuple(ref) for ref in refs])
+        return graph
+
+    @classmethod
+    def load(cls, path):
+        """读取保存的链接图，文件不存在或格式不符时返回空图"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except Exception:
+            return cls()
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
@@ -4,8 +4,82 @@
 链接重写工具
 """
 
+import os
 import re
-from pathlib import Path
+
+from scripts import profiler
+
+LINK_RE = re.compile(r"\[([^\]]+)\]\(\./([^)]+)\)")
+
+# resolve: 按文件系统解析（跟随符号链接，与 Path.resolve 一致）；lexical: 只做路径字符串规范化，不访问文件系统
+MODES = ("resolve", "lexical")
+DEFAULT_MODE = "resolve"
+
+_mode = DEFAULT_MODE
+_root = None
+# (source_dir, rel_path) -> config_path；每次运行开始时清空（configure / reset）
+_cache = {}
+
+
+def configure(mode=None):
+    """设置解析模式并清空缓存；未知模式抛出 ValueError"""
+    global _mode
+    mode = mode or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f"未知的链接解析模式: {mode}（可选: {', '.join(MODES)}）")
+    _mode = mode
+    reset()
+
+
+def reset():
+    """清空解析缓存，工作目录在下次解析时重新确定（文件系统或工作目录可能已变化时调用）"""
+    global _root
+    _cache.clear()
+    _root = None
+
+
+def get_mode():
+    return _mode
+
+
+def _resolve(source_dir, rel_path):
+    global _root
+    if _root is None:
+        _root = os.path.realpath(".") if _mode == "resolve" else os.path.abspath(".")
+    joined = os.path.join(_root, source_dir, rel_path)
+    ref_file = os.path.realpath(joined) if _mode == "resolve" else os.path.normpath(joined)
+    if ref_file == _root:
+        return "."
+    prefix = _root if _root.endswith(os.sep) else _root + os.sep
+    if not ref_file.startswith(prefix):
+        return None
+    return ref_file[len(prefix):].replace("\\", "/")
+
+
+def resolve_ref_config_path(source_dir, rel_path):
+    """
+    将源文件中的 ./ 相对链接解析为 config_path（相对当前工作目录），无法解析时返回 None
+    结果按 (source_dir, rel_path) 缓存，工作目录每次运行只解析一次
+    """
+    key = (source_dir, rel_path)
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
+    with profiler.timer("link", "resolve_ref_config_path"):
+        result = _cache[key] = _resolve(source_dir, rel_path)
+    return result
+
+
+def iter_link_refs(content, file_path_obj):
+    """列出内容中所有可重写链接指向的 config_path（去重，保持出现顺序）"""
+    source_dir = file_path_obj.parent
+    seen = []
+    for match in LINK_RE.finditer(content):
+        ref_config_path = resolve_ref_config_path(source_dir, match.group(2))
+        if ref_config_path and ref_config_path not in seen:
+            seen.append(ref_config_path)
+    return seen
 
 
 def rewrite_links_to_task(content, file_path_obj, rule, resolver):
@@ -23,10 +97,8 @@ def rewrite_links_to_task(content, file_path_obj, rule, resolver):
         text = match.group(1)
         rel_path = match.group(2)
 
-        ref_file = (source_dir / rel_path).resolve()
-        try:
-            ref_config_path = str(ref_file.relative_to(Path(".").resolve())).replace("\\", "/")
-        except ValueError:
+        ref_config_path = resolve_ref_config_path(source_dir, rel_path)
+        if ref_config_path is None:
             return match.group(0)
 
         target_path = resolver(target_task, ref_config_path)
@@ -41,7 +113,7 @@ def rewrite_links_to_task(content, file_path_obj, rule, resolver):
 
         return match.group(0)
 
-    return re.sub(r"\[([^\]]+)\]\(\./([^)]+)\)", repl, content)
+    return LINK_RE.sub(repl, content)
 
 
 def process(task_name: str, ctx: dict):
@@ -58,5 +130,3 @@ def process(task_name: str, ctx: dict):
         ctx.get("rule", {}),
         ctx.get("resolver"),
     )
-
-
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分级、缓冲的日志输出
+
+级别:
+  quiet   - 只输出错误
+  summary - 运行/任务级进度与统计
+  verbose - 逐文件、逐规则的处理明细（默认，与原 print 输出一致）
+  debug   - 额外的调试信息
+
+log.result() 输出命令的查询结果（--links-to、--plan 等），与错误一样不受级别限制
+
+调用方式与 % 格式化一致：log.verbose("    📝 %s", config_path)
+级别未启用时直接返回，不做任何字符串格式化；热点循环可先判断 log.enabled(log.VERBOSE)
+"""
+
+import atexit
+import contextlib
+import json
+import sys
+import threading
+import time
+
+RESULT = -1
+QUIET = 0
+SUMMARY = 1
+VERBOSE = 2
+DEBUG = 3
+
+LEVELS = {"quiet": QUIET, "summary": SUMMARY, "verbose": VERBOSE, "debug": DEBUG}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+LEVEL_NAMES[QUIET] = "error"
+LEVEL_NAMES[RESULT] = "result"
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+FLUSH_INTERVAL = 0.2
+
+
+class Logger:
+    """
+    日志记录为 (level, msg, fields, ts) 元组：
+    - 文本模式输出 msg 原文；json 模式每条记录输出一行 JSON
+    - capture() 期间当前线程的记录收集到列表，稍后由 replay() 按顺序输出，
+      用于线程池逐文件日志块与多进程任务日志
+    """
+
+    def __init__(self):
+        self.level = VERBOSE
+        self.json_lines = False
+        self.stream = None
+        self.buffer_size = DEFAULT_BUFFER_SIZE
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    # 配置
+    def configure(self, level=None, json_lines=None, stream=None, buffer_size=None):
+        if level is not None:
+            self.level = LEVELS[level] if isinstance(level, str) else int(level)
+        if json_lines is not None:
+            self.json_lines = bool(json_lines)
+        if stream is not None:
+            self.stream = stream
+        if buffer_size is not None:
+            self.buffer_size = buffer_size
+
+    def get_config(self):
+        """可跨进程传递的配置（不含输出流）"""
+        return {"level": self.level, "json_lines": self.json_lines, "buffer_size": self.buffer_size}
+
+    def enabled(self, level):
+        return level <= self.level
+
+    # 记录
+    def result(self, msg, *args, **fields):
+        self._log(RESULT, msg, args, fields)
+
+    def error(self, msg, *args, **fields):
+        self._log(QUIET, msg, args, fields)
+
+    def summary(self, msg, *args, **fields):
+        if SUMMARY <= self.level:
+            self._log(SUMMARY, msg, args, fields)
+
+    def verbose(self, msg, *args, **fields):
+        if VERBOSE <= self.level:
+            self._log(VERBOSE, msg, args, fields)
+
+    def debug(self, msg, *args, **fields):
+        if DEBUG <= self.level:
+            self._log(DEBUG, msg, args, fields)
+
+    def _log(self, level, msg, args, fields):
+        if args:
+            msg = msg % args
+        record = (level, msg, fields, time.time())
+        records = getattr(self._local, "records", None)
+        if records is not None:
+            records.append(record)
+        else:
+            self._emit(record)
+
+    # 捕获与回放
+    @contextlib.contextmanager
+    def capture(self):
+        """收集当前线程的日志记录（可嵌套，内层结束后记录回到外层）"""
+        outer = getattr(self._local, "records", None)
+        records = []
+        self._local.records = records
+        try:
+            yield records
+        finally:
+            self._local.records = outer
+
+    def replay(self, records):
+        outer = getattr(self._local, "records", None)
+        if outer is not None:
+            outer.extend(records)
+            return
+        for record in records:
+            self._emit(record)
+
+    # 输出
+    def _format(self, record):
+        level, msg, fields, ts = record
+        if not self.json_lines:
+            return msg + "\n"
+        text = msg.strip("\n")
+        if not text and not fields:
+            return ""
+        data = {"ts": round(ts, 6), "level": LEVEL_NAMES.get(level, str(level)), "msg": text}
+        data.update(fields)
+        return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+    def _emit(self, record):
+        text = self._format(record)
+        if not text:
+            return
+        with self._lock:
+            self._buffer.append(text)
+            self._buffered += len(text)
+            now = time.monotonic()
+            if self._buffered >= self.buffer_size or now - self._last_flush >= FLUSH_INTERVAL or record[0] == QUIET:
+                self._flush_locked(now)
+
+    def _flush_locked(self, now=None):
+        if self._buffer:
+            stream = self.stream or sys.stdout
+            stream.write("".join(self._buffer))
+            stream.flush()
+            self._buffer = []
+            self._buffered = 0
+        self._last_flush = now if now is not None else time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
+_logger = Logger()
+atexit.register(_logger.flush)
+
+configure = _logger.configure
+get_config = _logger.get_config
+enabled = _logger.enabled
+result = _logger.result
+error = _logger.error
+summary = _logger.summary
+verbose = _logger.verbose
+debug = _logger.debug
+capture = _logger.capture
+replay = _logger.replay
+flush = _logger.flush
+
+
+def get_logger():
+    return _logger
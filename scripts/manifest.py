@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量构建清单：记录输入哈希、规则链哈希与输出哈希，跳过未变化的 (task, file)
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_FILE = ".llm_dist_manifest.json"
+MANIFEST_VERSION = 2
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_obj(obj):
+    """对可 JSON 序列化对象计算稳定哈希"""
+    return hash_text(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str))
+
+
+def _stat_sig(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class BuildManifest:
+    """
+    结构:
+      inputs: {source_path: {"sig": [size, mtime_ns], "hash": sha256}}
+      tasks:  {task_name: {unit_idx: {config_path: {"input", "rules", "target", "output", "output_sig", "meta"?}}}}
+      meta 为分发时收集的文件元数据（如 settings 所需的 permission），跳过未变化的文件时沿用
+    previous 为上次运行的清单，current 为本次运行逐步构建的清单
+    """
+
+    def __init__(self, workpath: Path):
+        self.path = Path(workpath) / MANIFEST_FILE
+        self.previous = self._load()
+        self.current = {"version": MANIFEST_VERSION, "inputs": {}, "tasks": {}}
+        self.completed_tasks = set()
+        self.skipped = 0
+        self.rebuilt = 0
+
+    def _load(self):
+        empty = {"version": MANIFEST_VERSION, "inputs": {}, "tasks": {}}
+        if not self.path.exists():
+            return empty
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return empty
+        if data.get("version") != MANIFEST_VERSION:
+            return empty
+        return data
+
+    # 输入
+    def input_hash(self, file_path, read_content):
+        """文件大小与 mtime 未变时复用上次的哈希，否则读取内容重新计算"""
+        key = str(Path(file_path))
+        cached = self.current["inputs"].get(key)
+        if cached:
+            return cached["hash"]
+
+        sig = _stat_sig(file_path)
+        prev = self.previous["inputs"].get(key)
+        if prev and sig is not None and prev.get("sig") == sig:
+            digest = prev["hash"]
+        else:
+            digest = hash_text(read_content(file_path))
+        self.current["inputs"][key] = {"sig": sig, "hash": digest}
+        return digest
+
+    def input_unchanged(self, file_path):
+        """文件大小与 mtime 与上次一致（不读取内容）"""
+        prev = self.previous["inputs"].get(str(Path(file_path)))
+        return bool(prev) and _stat_sig(file_path) == prev.get("sig")
+
+    # 条目
+    def _prev_entry(self, task_name, unit_idx, config_path):
+        return self.previous["tasks"].get(task_name, {}).get(str(unit_idx), {}).get(config_path)
+
+    def is_fresh(self, task_name, unit_idx, config_path, input_hash, rules_hash, workpath):
+        """输入与规则均未变化，且上次的输出文件仍保持原样"""
+        entry = self._prev_entry(task_name, unit_idx, config_path)
+        if not entry or entry.get("input") != input_hash or entry.get("rules") != rules_hash:
+            return False
+        if entry.get("target") is None:
+            return True
+        return _stat_sig(Path(workpath) / entry["target"]) == entry.get("output_sig")
+
+    def previous_target(self, task_name, unit_idx, config_path):
+        entry = self._prev_entry(task_name, unit_idx, config_path)
+        return entry.get("target") if entry else None
+
+    def previous_meta(self, task_name, unit_idx, config_path):
+        entry = self._prev_entry(task_name, unit_idx, config_path)
+        return entry.get("meta") if entry else None
+
+    def keep(self, task_name, unit_idx, config_path, meta=None):
+        """沿用上次的条目；meta 非空时更新（旧清单中没有元数据的条目在此补上）"""
+        entry = dict(self._prev_entry(task_name, unit_idx, config_path))
+        if meta is not None:
+            entry["meta"] = meta
+        self._set_entry(task_name, unit_idx, config_path, entry)
+        self.skipped += 1
+
+    def record(self, task_name, unit_idx, config_path, input_hash, rules_hash, target=None, output_hash=None, meta=None):
+        """记录一次实际处理；target 为 None 表示被过滤，不产生输出"""
+        entry = {"input": input_hash, "rules": rules_hash, "target": None, "output": None, "output_sig": None}
+        if target is not None:
+            entry["target"] = str(target).replace("\\", "/")
+            entry["output"] = output_hash
+        if meta is not None:
+            entry["meta"] = meta
+        self._set_entry(task_name, unit_idx, config_path, entry)
+        self.rebuilt += 1
+
+    def _set_entry(self, task_name, unit_idx, config_path, entry):
+        units = self.current["tasks"].setdefault(task_name, {})
+        units.setdefault(str(unit_idx), {})[config_path] = entry
+
+    def mark_completed(self, task_name, workpath):
+        """
+        任务完成后统一记录输出文件状态：
+        多个源写入同一目标时，以任务结束时的最终文件为准
+        """
+        self.completed_tasks.add(task_name)
+        for entries in self.current["tasks"].setdefault(task_name, {}).values():
+            for entry in entries.values():
+                if entry.get("target"):
+                    entry["output_sig"] = _stat_sig(Path(workpath) / entry["target"])
+
+    # 跨进程合并
+    def export_task(self, task_name):
+        """导出单个任务在本次运行中的条目与输入哈希，供主进程合并"""
+        return {
+            "task": task_name,
+            "units": self.current["tasks"].get(task_name, {}),
+            "inputs": self.current["inputs"],
+            "completed": task_name in self.completed_tasks,
+            "skipped": self.skipped,
+            "rebuilt": self.rebuilt,
+        }
+
+    def merge_task(self, part):
+        task_name = part["task"]
+        self.current["tasks"][task_name] = part["units"]
+        self.current["inputs"].update(part["inputs"])
+        if part["completed"]:
+            self.completed_tasks.add(task_name)
+        self.skipped += part["skipped"]
+        self.rebuilt += part["rebuilt"]
+
+    # 过期输出
+    def stale_outputs(self):
+        """上次产生、本次已无条目产生的输出（仅统计已完成的任务）"""
+        produced = set()
+        for units in self.current["tasks"].values():
+            for entries in units.values():
+                for entry in entries.values():
+                    if entry.get("target"):
+                        produced.add(entry["target"])
+
+        stale = set()
+        for task_name in self.completed_tasks:
+            for entries in self.previous["tasks"].get(task_name, {}).values():
+                for entry in entries.values():
+                    target = entry.get("target")
+                    if target and target not in produced:
+                        stale.add(target)
+        return sorted(stale)
+
+    def save(self):
+        # 未完成的任务保留上次的条目，保证下次仍能追踪其输出
+        for task_name, units in self.previous["tasks"].items():
+            if task_name in self.completed_tasks:
+                continue
+            cur_units = self.current["tasks"].setdefault(task_name, {})
+            for unit_idx, entries in units.items():
+                cur_entries = cur_units.setdefault(unit_idx, {})
+                for config_path, entry in entries.items():
+                    cur_entries.setdefault(config_path, entry)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.current, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的处理结果缓存（--output-cache）：缓存 process_content + 分发单元 process 规则的最终输出
+
+键为 (输入内容哈希, 该文件适用的规则链, 链接所指文件的目标路径, 解析方式) 的哈希，与机器和 workpath 无关，
+目录可指向多台机器共享的挂载点；条目以临时文件 + 原子替换写入，并发写入同一键时结果相同
+命中时更新条目 mtime，运行结束时总大小超过上限则按 mtime 从旧到新淘汰到上限的 90%
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from scripts import log
+from scripts.manifest import hash_obj
+from scripts.output_writer import atomic_write
+
+OUTPUT_CACHE_VERSION = 1
+DEFAULT_MAX_MB = 512
+# 淘汰后保留的比例，避免每次运行都在上限附近反复淘汰
+LOW_WATER = 0.9
+
+
+def cache_key(input_hash, groups, dist_process, link_deps, modes):
+    """
+    input_hash: 源文件内容哈希；groups: 匹配到的内容规则组（原始配置）；dist_process: 分发单元 process 规则
+    link_deps: {target_task: {ref_config_path: target_path}}；modes: 影响处理结果的解析方式
+    """
+    return hash_obj(
+        {
+            "version": OUTPUT_CACHE_VERSION,
+            "input": input_hash,
+            "groups": groups,
+            "process": dist_process,
+            "link_deps": link_deps,
+            "modes": modes,
+        }
+    )
+
+
+class OutputCache:
+    """
+    目录结构: <root>/<key[:2]>/<key[2:]>，内容为 utf-8 文本
+    统计可在线程池中累加，子进程的统计经 merge_stats() 汇总
+    """
+
+    def __init__(self, root, max_mb=DEFAULT_MAX_MB):
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def __getstate__(self):
+        return {"root": str(self.root), "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["root"])
+        self.max_bytes = state["max_bytes"]
+
+    def _path(self, key):
+        return self.root / key[:2] / key[2:]
+
+    def _count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def get(self, key):
+        """返回缓存的输出，不存在或不可读时返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            self._count("misses")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count("hits")
+        return content
+
+    def put(self, key, content):
+        """写入失败（如共享目录只读）只记录日志，不影响分发"""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(path, content.encode("utf-8"))
+        except OSError as e:
+            log.debug("    ⚠️  输出缓存写入失败: %s - %s", path, e)
+            return False
+        self._count("stores")
+        return True
+
+    def _entries(self):
+        entries = []
+        if not self.root.is_dir():
+            return entries
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for entry in os.scandir(shard.path):
+                # 跳过写入中的临时文件
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def prune(self):
+        """总大小超过上限时按 mtime 从旧到新删除，返回删除的条目数"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+        target = self.max_bytes * LOW_WATER
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        self._count("evictions", evicted)
+        return evicted
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.stores = 0
+            self.evictions = 0
+
+    def merge_stats(self, stats):
+        for name in ("hits", "misses", "stores", "evictions"):
+            self._count(name, stats.get(name, 0))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "evictions": self.evictions}
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - root
+      - max_mb（可选）
+    返回: 淘汰的条目数
+    """
+    return OutputCache(ctx.get("root"), ctx.get("max_mb", DEFAULT_MAX_MB)).prune()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输出写入：内容未变化时不写文件（保留 mtime，避免编辑器与索引器重复索引），
+需要写入时先写临时文件再原子替换，中途崩溃不会留下写了一半的文件
+"""
+
+import contextlib
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from scripts import profiler
+
+
+def encode_text(content):
+    """与文本模式写入一致的字节内容（utf-8，换行符按平台转换）"""
+    if os.linesep != "\n":
+        content = content.replace("\n", os.linesep)
+    return content.encode("utf-8")
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def is_unchanged(path, data):
+    """先比较大小，大小相同再比较哈希"""
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        return _file_digest(path) == hashlib.sha256(data).digest()
+    except OSError:
+        return False
+
+
+@contextlib.contextmanager
+def atomic_open(path):
+    """打开同目录下的临时文件（二进制写），正常退出时 os.replace 到目标路径，出错时删除临时文件"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path, data):
+    """写入同目录下的临时文件后 os.replace 到目标路径"""
+    with atomic_open(path) as f:
+        f.write(data)
+
+
+def write_if_changed(path, content):
+    """返回是否实际写入；写入失败时抛出原始异常"""
+    data = encode_text(content)
+    with profiler.timer("io", "compare"):
+        if is_unchanged(path, data):
+            return False
+    with profiler.timer("io", "write"):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+    profiler.add_bytes("written", len(data))
+    return True
+
+
+class OutputWriter:
+    """write_if_changed 加上写入/未变化计数，可在线程池与子进程中使用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.written = 0
+        self.unchanged = 0
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    # 输出落在 workpath 中（归档等输出目标为 False）
+    materializes = True
+
+    def write(self, path, content, task=None):
+        """task: 产生该输出的任务名（供按任务区分输出的目标使用，写入文件时忽略）"""
+        written = write_if_changed(path, content)
+        with self._lock:
+            if written:
+                self.written += 1
+            else:
+                self.unchanged += 1
+        return written
+
+    def reset_stats(self):
+        with self._lock:
+            self.written = 0
+            self.unchanged = 0
+
+    def export(self):
+        """子进程中待回传主进程的输出（已直接写入文件，无需回传）"""
+        return None
+
+    def merge(self, data):
+        pass
+
+    def close(self):
+        pass
+
+    def merge_stats(self, stats):
+        with self._lock:
+            self.written += stats.get("written", 0)
+            self.unchanged += stats.get("unchanged", 0)
+
+    def stats(self):
+        return {"written": self.written, "unchanged": self.unchanged}
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - path
+      - content
+    返回: 是否实际写入
+    """
+    return write_if_changed(ctx.get("path"), ctx.get("content", ""))
@@ -5,16 +5,44 @@
 """
 
 import json
+import os
 from pathlib import Path
 
+from scripts import log, profiler
+from scripts.frontmatter import read_header
+from scripts.glob_index import compile_glob, literal_prefix
+from scripts.walk_cache import supports as walk_supports
 
-def collect_source(source_config):
+
+def source_label(source_config):
+    """source 配置的简短描述，用于日志与剖析"""
+    if isinstance(source_config, str):
+        return source_config
+    if source_config.get("type") == "directory":
+        return f"{source_config.get('path')}/{source_config.get('pattern', '**/*.md')}"
+    return str(source_config.get("path"))
+
+
+def collect_source(source_config, walk_cache=None):
+    """
+    返回 [(file_path, config_path)]
+    walk_cache: 可选的 WalkCache，同一次运行中相同根目录只遍历一次
+    """
+    if not profiler.enabled():
+        return _collect_source(source_config, walk_cache)
+    with profiler.timer("collect", source_label(source_config)):
+        return _collect_source(source_config, walk_cache)
+
+
+def _collect_source(source_config, walk_cache):
     files = []
 
     # 兼容字符串形式
     if isinstance(source_config, str):
         source_str = source_config
         if "**" in source_str or "*" in source_str:
+            if walk_cache is not None and walk_supports(source_str):
+                return walk_cache.glob_relative(source_str)
             matched = list(Path(".").glob(source_str))
             for file_path in matched:
                 if file_path.is_file():
@@ -39,6 +67,8 @@ def collect_source(source_config):
     elif source_type == "directory":
         dir_path = Path(path)
         pattern = source_config.get("pattern", "**/*.md")
+        if walk_cache is not None and walk_supports(pattern):
+            return walk_cache.glob(dir_path, pattern) if dir_path.is_dir() else files
         if dir_path.exists():
             for file_path in dir_path.glob(pattern):
                 if file_path.is_file():
@@ -47,21 +77,91 @@ def collect_source(source_config):
     return files
 
 
+def _relative_to(abs_path, root):
+    """abs_path 位于 root 之下时返回 / 分隔的相对路径，否则返回 None"""
+    rel = os.path.relpath(abs_path, os.path.abspath(root))
+    if rel == ".." or rel.startswith(".." + os.sep) or os.path.isabs(rel):
+        return None
+    return rel.replace("\\", "/")
+
+
+def match_source(source_config, file_path):
+    """
+    判断某个文件是否属于该 source（不要求文件存在）
+    返回与 collect_source 一致的 (file_path, config_path)，不属于时返回 None
+    """
+    abs_path = os.path.abspath(file_path)
+
+    if isinstance(source_config, str):
+        source_str = source_config.replace("\\", "/")
+        if "**" in source_str or "*" in source_str:
+            while source_str.startswith("./"):
+                source_str = source_str[2:]
+            prefix = literal_prefix(source_str)
+            root = "/".join(prefix) or "."
+            rest = source_str[len(root) + 1:] if prefix else source_str
+            rel = _relative_to(abs_path, root)
+            if rel is None or not compile_glob(rest).match(rel):
+                return None
+            matched = Path(root) / rel
+        else:
+            matched = Path(source_str)
+            if os.path.abspath(matched) != abs_path:
+                return None
+        return matched, str(matched).replace("\\", "/")
+
+    source_type = source_config.get("type")
+    path = source_config.get("path")
+    if source_type == "file":
+        matched = Path(path)
+        if os.path.abspath(matched) != abs_path:
+            return None
+    elif source_type == "directory":
+        rel = _relative_to(abs_path, path)
+        if rel is None or not compile_glob(source_config.get("pattern", "**/*.md")).match(rel):
+            return None
+        matched = Path(path) / rel
+    else:
+        return None
+    return matched, str(matched).replace("\\", "/")
+
+
+def source_roots(source_config):
+    """source 需要监听的目录"""
+    if isinstance(source_config, str):
+        source_str = source_config.replace("\\", "/")
+        if "**" in source_str or "*" in source_str:
+            while source_str.startswith("./"):
+                source_str = source_str[2:]
+            return ["/".join(literal_prefix(source_str)) or "."]
+        return [str(Path(source_str).parent)]
+    if source_config.get("type") == "directory":
+        return [source_config.get("path")]
+    if source_config.get("type") == "file":
+        return [str(Path(source_config.get("path")).parent)]
+    return []
+
+
 def process(task_name: str, ctx: dict):
     """
     ctx:
       - source_config
+      - walk_cache（可选）
     返回: [(file_path, config_path)]
     """
-    return collect_source(ctx.get("source_config"))
+    return collect_source(ctx.get("source_config"), ctx.get("walk_cache"))
 
 
-def precompute_all_path_mappings(tasks, filter_proc, compute_target_path):
+def precompute_all_path_mappings(tasks, filter_proc, compute_target_path, read_content=None, walk_cache=None):
     """
     返回 {task_name: {config_path: target_path}}
+    read_content: 可选，读取过滤器所需内容的函数；默认 frontmatter.read_header 只读取文件开头的 frontmatter，
+    内存与 I/O 只与 frontmatter 大小相关，文件其余部分在实际处理时才读取
+    walk_cache: 可选，共享的目录遍历缓存
     """
+    read_content = read_content or read_header
     mappings = {}
-    print("\n📊 预计算路径映射...")
+    log.summary("\n📊 预计算路径映射...")
 
     for task in tasks:
         task_name = task.get("name", "unnamed")
@@ -72,14 +172,13 @@ def precompute_all_path_mappings(tasks, filter_proc, compute_target_path):
             if not source_config:
                 continue
 
-            files = collect_source(source_config)
+            files = collect_source(source_config, walk_cache)
 
             for file_path, config_path in files:
                 dist_filters = dist_rule.get("filter", [])
                 if dist_filters:
                     try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            content = f.read()
+                        content = read_content(file_path)
                         if not filter_proc(
                             task_name,
                             {
@@ -94,9 +193,10 @@ def precompute_all_path_mappings(tasks, filter_proc, compute_target_path):
 
                 target_path = compute_target_path(file_path, dist_rule)
                 task_mapping[config_path] = target_path
+                log.debug("    %s -> %s", config_path, target_path)
 
         mappings[task_name] = task_mapping
-        print(f"  📦 {task_name}: {len(task_mapping)} 个文件映射")
+        log.summary("  📦 %s: %d 个文件映射", task_name, len(task_mapping))
 
     return mappings
 
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分发计划（--plan）：不执行 process 规则、不写任何输出，只计算每个 task 的源文件 -> 目标路径映射，
+以及每个文件适用的分发过滤器、content_rules 规则组与分发单元 process 规则
+
+过滤器只读取文件开头的 frontmatter（frontmatter.read_header），耗时与 frontmatter 大小相关而与文件大小无关
+content_rules 组过滤器按源文件的 frontmatter 判断（实际运行时在前面的规则组处理之后判断，结果可能不同）
+"""
+
+import json
+
+from scripts import frontmatter
+from scripts.content_rules import compile_process_rules, compile_task_rules
+from scripts.filters import passes_filters_silent, process_silent as filters_process_silent
+from scripts.paths import collect_source, precompute_all_path_mappings, source_label
+from scripts.rename_rules import compute_target_path
+from scripts.walk_cache import WalkCache
+
+PLAN_VERSION = 1
+
+
+def _make_header_reader():
+    """同一次计划内每个文件只读取一次开头"""
+    headers = {}
+
+    def read(file_path):
+        key = str(file_path)
+        if key not in headers:
+            headers[key] = frontmatter.read_header(file_path)
+        return headers[key]
+
+    return read
+
+
+def _filter_results(filters, header):
+    return [
+        {"description": rule.get("description", f"过滤 {i}"), "passed": passes_filters_silent([rule], header)}
+        for i, rule in enumerate(filters, 1)
+    ]
+
+
+def _plan_file(task_plan, dist_rule, unit_process, file_path, config_path, header):
+    entry = {"source": config_path, "target": None}
+    dist_filters = dist_rule.get("filter", [])
+    if dist_filters:
+        entry["filters"] = _filter_results(dist_filters, header)
+        if not passes_filters_silent(dist_filters, header):
+            return entry
+
+    entry["target"] = compute_target_path(file_path, dist_rule)
+    entry["groups"] = [
+        {
+            "pattern": group.pattern,
+            "filters": _filter_results(group.filters, header),
+            "rules": [rule.description for rule in group.process],
+        }
+        for group in task_plan.match(config_path)
+    ]
+    entry["process"] = [rule.description for rule in unit_process]
+    return entry
+
+
+def build_plan(tasks, content_rules, read_header=None, walk_cache=None):
+    """
+    返回 {"version", "tasks": [{"name", "mapping", "units": [...], "conflicts": {...}}]}
+    mapping 与 precompute_all_path_mappings 的结果一致（同一源文件后面的分发单元覆盖前面的）
+    conflicts 为多个源文件写入同一目标路径的情况（按处理顺序最后写入的生效）
+    无效正则时抛出 ValueError
+    """
+    read_header = read_header or _make_header_reader()
+    walk_cache = walk_cache if walk_cache is not None else WalkCache()
+
+    mappings = precompute_all_path_mappings(
+        tasks,
+        filters_process_silent,
+        compute_target_path,
+        read_content=read_header,
+        walk_cache=walk_cache,
+    )
+
+    plan_tasks = []
+    for task in tasks:
+        task_name = task.get("name", "unnamed")
+        task_plan = compile_task_rules(content_rules, task_name)
+        units = []
+        writers = {}
+        for dist_idx, dist_rule in enumerate(task.get("distribute", []), 1):
+            source_config = dist_rule.get("source")
+            if not source_config:
+                continue
+            unit_process = compile_process_rules(dist_rule.get("process", []))
+            files = []
+            for file_path, config_path in collect_source(source_config, walk_cache):
+                try:
+                    header = read_header(file_path)
+                except Exception as e:
+                    files.append({"source": config_path, "target": None, "error": str(e)})
+                    continue
+                entry = _plan_file(task_plan, dist_rule, unit_process, file_path, config_path, header)
+                if entry["target"]:
+                    writers.setdefault(entry["target"], []).append(config_path)
+                files.append(entry)
+            units.append({"index": dist_idx, "source": source_label(source_config), "files": files})
+
+        plan_tasks.append(
+            {
+                "name": task_name,
+                "mapping": mappings.get(task_name, {}),
+                "units": units,
+                "conflicts": {target: sources for target, sources in writers.items() if len(sources) > 1},
+            }
+        )
+    return {"version": PLAN_VERSION, "tasks": plan_tasks}
+
+
+def _format_filters(results):
+    return "，".join(f"{'✓' if r['passed'] else '✗'} {r['description']}" for r in results)
+
+
+def format_plan(plan):
+    """计划的文本形式（逐行）"""
+    lines = []
+    for task in plan["tasks"]:
+        lines.append(f"\n📋 {task['name']}: {len(task['mapping'])} 个文件映射")
+        for unit in task["units"]:
+            lines.append(f"  📁 分发单元 {unit['index']}: {unit['source']} ({len(unit['files'])} 个文件)")
+            for entry in unit["files"]:
+                if entry.get("error"):
+                    lines.append(f"    ❌ {entry['source']}: {entry['error']}")
+                    continue
+                if not entry["target"]:
+                    lines.append(f"    ⏭️  {entry['source']} (过滤未通过: {_format_filters(entry['filters'])})")
+                    continue
+                lines.append(f"    {entry['source']} -> {entry['target']}")
+                if entry.get("filters"):
+                    lines.append(f"      过滤: {_format_filters(entry['filters'])}")
+                for group in entry["groups"]:
+                    detail = "，".join(group["rules"]) or "无 process 规则"
+                    if group["filters"]:
+                        detail = f"{_format_filters(group['filters'])}；{detail}"
+                    lines.append(f"      🔧 {group['pattern']}: {detail}")
+                if entry["process"]:
+                    lines.append(f"      ⚙️  分发单元规则: {'，'.join(entry['process'])}")
+        for target, sources in task["conflicts"].items():
+            lines.append(f"  ⚠️  {len(sources)} 个源文件写入 {target}（最后写入的生效）: {', '.join(sources)}")
+    return lines
+
+
+def write_plan(plan, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - tasks
+      - content_rules
+      - walk_cache（可选）
+    返回: build_plan 结果
+    """
+    return build_plan(ctx.get("tasks", []), ctx.get("content_rules", {}), walk_cache=ctx.get("walk_cache"))
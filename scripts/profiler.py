@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行剖析（--profile）：记录各计时点的累计耗时与调用次数，以及读写字节数
+
+分类:
+  phase   - 流水线阶段（compile / precompute / clean / tasks / task:<name> / settings:<name> / finalize / fanout）
+  collect - 源文件收集（paths.collect_source，按 source 配置）
+  pattern - content_rules 路径模式（含该组过滤与全部规则）
+  rule    - 单条 process 规则（按 description）
+  link    - 链接路径解析（link_resolver）
+  io      - 源文件读取 / 输出比较与写入
+
+各分类的耗时相互包含（pattern 包含其下 rule 与 link），只在同一分类内比较
+未启用时 timer() 返回空操作的上下文管理器，计时点只有一次属性判断，开销可忽略
+"""
+
+import json
+import threading
+import time
+
+from scripts import log
+
+PROFILE_VERSION = 1
+DEFAULT_PROFILE_FILE = "llm_dist_profile.json"
+DEFAULT_TOP = 10
+
+CATEGORY_LABELS = {
+    "phase": "阶段",
+    "collect": "源文件收集",
+    "pattern": "内容规则模式",
+    "rule": "单条规则",
+    "link": "链接解析",
+    "io": "读写",
+}
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("profiler", "category", "name", "start")
+
+    def __init__(self, profiler, category, name):
+        self.profiler = profiler
+        self.category = category
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.category, self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    sections: {分类: {名称: [累计秒数, 调用次数]}}；bytes: {"read": 源文件字节, "written": 实际写入字节}
+    线程池内共享同一实例（加锁累加），子进程的结果经 export() / merge() 汇总
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sections = {}
+            self.bytes = {"read": 0, "written": 0}
+
+    def enable(self, enabled=True):
+        self.enabled = bool(enabled)
+        self.reset()
+
+    def timer(self, category, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, category, name)
+
+    def add(self, category, name, seconds, calls=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self.sections.setdefault(category, {}).setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+
+    def add_bytes(self, kind, size):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.bytes[kind] = self.bytes.get(kind, 0) + size
+
+    def export(self):
+        """可跨进程传递的数据"""
+        with self._lock:
+            return {
+                "sections": {cat: {name: list(entry) for name, entry in names.items()} for cat, names in self.sections.items()},
+                "bytes": dict(self.bytes),
+            }
+
+    def merge(self, data):
+        if not data:
+            return
+        for category, names in data.get("sections", {}).items():
+            for name, (seconds, calls) in names.items():
+                self.add(category, name, seconds, calls)
+        for kind, size in data.get("bytes", {}).items():
+            self.add_bytes(kind, size)
+
+    def to_dict(self):
+        data = self.export()
+        sections = {}
+        for category, names in data["sections"].items():
+            ranked = sorted(names.items(), key=lambda item: item[1][0], reverse=True)
+            sections[category] = [{"name": name, "seconds": round(seconds, 6), "calls": calls} for name, (seconds, calls) in ranked]
+        return {"version": PROFILE_VERSION, "sections": sections, "bytes": data["bytes"]}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def report(self, top=DEFAULT_TOP):
+        """按分类输出耗时最多的前 top 项"""
+        data = self.to_dict()
+        log.summary("\n⏱️  性能剖析 (每类前 %d 项，耗时按分类内比较):", top)
+        for category in list(CATEGORY_LABELS) + sorted(set(data["sections"]) - set(CATEGORY_LABELS)):
+            entries = data["sections"].get(category)
+            if not entries:
+                continue
+            log.summary("  [%s]", CATEGORY_LABELS.get(category, category))
+            for entry in entries[:top]:
+                log.summary("    %10.1f ms  %8d 次  %s", entry["seconds"] * 1000, entry["calls"], entry["name"])
+        log.summary(
+            "  [字节] 读取 %d，写入 %d",
+            data["bytes"].get("read", 0),
+            data["bytes"].get("written", 0),
+            event="profile",
+            bytes=data["bytes"],
+        )
+
+
+_profiler = Profiler()
+
+enable = _profiler.enable
+reset = _profiler.reset
+timer = _profiler.timer
+add = _profiler.add
+add_bytes = _profiler.add_bytes
+export = _profiler.export
+merge = _profiler.merge
+to_dict = _profiler.to_dict
+save = _profiler.save
+report = _profiler.report
+
+
+def enabled():
+    return _profiler.enabled
+
+
+def get_profiler():
+    return _profiler
+
+
+def process(task_name: str, ctx: dict):
+    """
+    ctx:
+      - path（可选，写出完整 JSON）
+      - top（可选，输出前 N 项）
+    返回: 剖析数据 dict
+    """
+    if ctx.get("path"):
+        save(ctx["path"])
+    report(ctx.get("top", DEFAULT_TOP))
+    return to_dict()
@@ -5,39 +5,34 @@ settings.local.json 生成（claude 专用逻辑由调用方决定是否使用
 """
 
 import json
-import re
 from pathlib import Path
 
+from scripts import frontmatter, log
+from scripts.frontmatter import FRONTMATTER_RE
 from scripts.filters import passes_filters_silent
+from scripts.output_writer import write_if_changed
 
 
-def extract_frontmatter_field(content, field, regex):
-    """从 frontmatter 中提取字段值"""
-    m = regex.match(content)
-    if not m:
-        return None
-    fm_body = m.group(1)
-    match = re.search(rf"^{re.escape(field)}\s*:\s*(.+)$", fm_body, flags=re.MULTILINE)
-    if match:
-        return match.group(1).strip()
-    return None
+def extract_frontmatter_field(content, field, regex=FRONTMATTER_RE):
+    """从 frontmatter 中提取字段值（解析结果按 frontmatter 文本缓存）"""
+    meta = frontmatter.parse(content, regex)
+    return meta.value(field) if meta is not None else None
 
 
-def generate_settings_permissions(task, workpath, default_permission, target_file, collect_source, get_target_path, frontmatter_re):
-    """
-    生成/更新 settings.local.json 的 permissions
-    （是否调用由上层根据 task 决定）
-    """
-    generate_settings_cfg = task.get("generate_settings")
-    if not generate_settings_cfg:
-        return None
+def _read_file(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
 
-    task_name = task.get("name", "unnamed")
-    target_file = generate_settings_cfg.get("target", target_file)
-    default_permission = generate_settings_cfg.get("default_permission", default_permission)
 
-    permissions = {"allow": [], "deny": [], "ask": []}
+def file_permission(content, frontmatter_re=None):
+    """文件 frontmatter 中的 permission 字段（未设置时为 None，由生成时的 default_permission 补齐）"""
+    return extract_frontmatter_field(content, "permission", frontmatter_re or FRONTMATTER_RE)
+
 
+def _scan_sources(task, collect_source, frontmatter_re, read_content):
+    """
+    未提供运行结果时的回退：重新遍历目录源并读取文件，逐个产出 (config_path, permission)
+    """
     for dist_rule in task.get("distribute", []):
         source_config = dist_rule.get("source")
         if not source_config:
@@ -48,8 +43,7 @@ def generate_settings_permissions(task, workpath, default_permission, target_fil
 
             for file_path, config_path in files:
                 try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
+                    content = read_content(file_path)
                 except:
                     continue
 
@@ -57,40 +51,95 @@ def generate_settings_permissions(task, workpath, default_permission, target_fil
                 if dist_filters and not passes_filters_silent(dist_filters, content):
                     continue
 
-                permission = extract_frontmatter_field(content, "permission", frontmatter_re) or default_permission
+                yield config_path, file_permission(content, frontmatter_re)
 
-                target_path = get_target_path(task_name, config_path)
-                if target_path:
-                    parts = target_path.split("/")
-                    if len(parts) >= 2:
-                        skill_name = parts[-2]
-                        skill_ref = f"Skill({skill_name})"
-                        if permission in permissions and skill_ref not in permissions[permission]:
-                            permissions[permission].append(skill_ref)
 
-    target_path = workpath / target_file
-    target_path.parent.mkdir(parents=True, exist_ok=True)
+def build_permissions(task_name, entries, get_target_path, default_permission):
+    """
+    entries: 按处理顺序的 (config_path, permission)
+    技能名取目标路径的上一级目录；每种权限内按首次出现的顺序去重
+    """
+    permissions = {"allow": [], "deny": [], "ask": []}
+    seen = set()
+    for config_path, permission in entries:
+        permission = permission or default_permission
+        if permission not in permissions:
+            continue
+        target_path = get_target_path(task_name, config_path)
+        if not target_path:
+            continue
+        parts = target_path.split("/")
+        if len(parts) < 2:
+            continue
+        key = (permission, parts[-2])
+        if key not in seen:
+            seen.add(key)
+            permissions[permission].append(f"Skill({parts[-2]})")
+    return permissions
+
+
+def generate_settings_permissions(
+    task,
+    workpath,
+    default_permission,
+    target_file,
+    collect_source,
+    get_target_path,
+    frontmatter_re,
+    read_content=None,
+    write_output=None,
+    file_meta=None,
+    merge_existing=True,
+):
+    """
+    生成/更新 settings.local.json 的 permissions
+    （是否调用由上层根据 task 决定）
+    read_content: 可选，读取源文件内容的函数（用于共享运行级内容缓存）
+    file_meta: 可选，分发时收集的 [(config_path, permission)]（目录源中通过过滤的文件，按处理顺序）；
+               提供时直接由其生成，不再遍历与读取源文件
+    merge_existing: 是否合并目标位置已有的 settings（输出写入归档时为 False）
+    """
+    generate_settings_cfg = task.get("generate_settings")
+    if not generate_settings_cfg:
+        return None
 
+    task_name = task.get("name", "unnamed")
+    read_content = read_content or _read_file
+    target_file = generate_settings_cfg.get("target", target_file)
+    default_permission = generate_settings_cfg.get("default_permission", default_permission)
+
+    if file_meta is None:
+        file_meta = _scan_sources(task, collect_source, frontmatter_re, read_content)
+    permissions = build_permissions(task_name, file_meta, get_target_path, default_permission)
+
+    target_path = workpath / target_file
     settings_content = {}
-    if target_path.exists():
+    if merge_existing and target_path.exists():
         try:
             with open(target_path, "r", encoding="utf-8") as f:
                 settings_content = json.load(f)
-            print(f"    📝 更新现有 {target_file}")
+            log.summary("    📝 更新现有 %s", target_file)
         except:
             settings_content = {}
 
     settings_content["permissions"] = permissions
 
+    write_output = write_output or write_if_changed
     try:
-        with open(target_path, "w", encoding="utf-8") as f:
-            json.dump(settings_content, f, indent=2, ensure_ascii=False)
-        print(f"    📤 {target_file}")
-        print(f"       allow: {len(permissions['allow'])} skills")
-        print(f"       deny: {len(permissions['deny'])} skills")
-        print(f"       ask: {len(permissions['ask'])} skills")
+        written = write_output(target_path, json.dumps(settings_content, indent=2, ensure_ascii=False))
+        log.summary(
+            "    📤 %s" if written else "    ⏸️  %s (未变化)",
+            target_file,
+            event="settings",
+            allow=len(permissions["allow"]),
+            deny=len(permissions["deny"]),
+            ask=len(permissions["ask"]),
+        )
+        log.summary("       allow: %d skills", len(permissions["allow"]))
+        log.summary("       deny: %d skills", len(permissions["deny"]))
+        log.summary("       ask: %d skills", len(permissions["ask"]))
     except Exception as e:
-        print(f"    ❌ 生成失败: {e}")
+        log.error("    ❌ 生成失败: %s", e, event="error")
         return None
 
     return settings_content
@@ -111,6 +160,10 @@ def process_claude(task_name: str, ctx: dict):
         collect_source=ctx.get("collect_source"),
         get_target_path=ctx.get("get_target_path"),
         frontmatter_re=ctx.get("frontmatter_re"),
+        read_content=ctx.get("read_content"),
+        write_output=ctx.get("write_output"),
+        file_meta=ctx.get("file_meta"),
+        merge_existing=ctx.get("merge_existing", True),
     )
 
 
@@ -124,6 +177,10 @@ def process_codebuddy(task_name: str, ctx: dict):
         collect_source=ctx.get("collect_source"),
         get_target_path=ctx.get("get_target_path"),
         frontmatter_re=ctx.get("frontmatter_re"),
+        read_content=ctx.get("read_content"),
+        write_output=ctx.get("write_output"),
+        file_meta=ctx.get("file_meta"),
+        merge_existing=ctx.get("merge_existing", True),
     )
 
 
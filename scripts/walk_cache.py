@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行级目录遍历缓存：每个根目录只 scandir 遍历一次，不同 pattern 共用同一份文件列表
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from scripts.glob_index import compile_glob, literal_prefix
+
+
+def _walk(root):
+    """
+    递归列出 root 下所有文件的相对路径（/ 分隔，按路径排序）
+    与 Path.glob 的 ** 一致，不进入符号链接目录
+    """
+    files = []
+    stack = [("", root)]
+    while stack:
+        rel_dir, abs_dir = stack.pop()
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            rel = f"{rel_dir}{entry.name}"
+            try:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        stack.append((rel + "/", entry.path))
+                elif entry.is_file():
+                    files.append(rel)
+            except OSError:
+                continue
+    files.sort(key=lambda p: p.split("/"))
+    return files
+
+
+class WalkCache:
+    """
+    files(root) 返回 root 下的全部文件（相对路径）；已遍历过祖先目录时直接从祖先结果中截取
+    glob(root, pattern) 返回 [(file_path, config_path)]，语义与 Path(root).glob(pattern) 的文件部分一致
+    """
+
+    def __init__(self):
+        self._walks = {}
+        self._globs = {}
+        self._lock = threading.Lock()
+        self.walks = 0
+        self.hits = 0
+
+    def __getstate__(self):
+        # 跨进程传递时带上已遍历结果，子进程无需重新遍历
+        with self._lock:
+            return {"walks": dict(self._walks)}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._walks.update(state.get("walks", {}))
+
+    @staticmethod
+    def _key(root):
+        return os.path.normpath(str(root))
+
+    def files(self, root):
+        key = self._key(root)
+        with self._lock:
+            cached = self._walks.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            # 祖先目录已遍历：截取其子树
+            parts = Path(key).parts
+            ancestors = [(os.path.join(*parts[:i]), parts[i:]) for i in range(len(parts) - 1, 0, -1)]
+            if not Path(key).is_absolute():
+                ancestors.append((".", parts))
+            for ancestor_key, rest in ancestors:
+                ancestor = self._walks.get(ancestor_key)
+                if ancestor is None:
+                    continue
+                prefix = "/".join(rest) + "/"
+                files = [p[len(prefix):] for p in ancestor if p.startswith(prefix)]
+                self._walks[key] = files
+                self.hits += 1
+                return files
+
+        files = _walk(key)
+        with self._lock:
+            self._walks[key] = files
+            self.walks += 1
+        return files
+
+    def glob(self, root, pattern):
+        key = (self._key(root), pattern)
+        with self._lock:
+            cached = self._globs.get(key)
+        if cached is not None:
+            return list(cached)
+
+        regex = compile_glob(pattern)
+        root_path = Path(root)
+        results = []
+        for rel in self.files(root):
+            if regex.match(rel):
+                file_path = root_path / rel
+                results.append((file_path, str(file_path).replace("\\", "/")))
+
+        with self._lock:
+            self._globs[key] = results
+        return list(results)
+
+    def glob_relative(self, source_str):
+        """字符串形式的 source：以模式的字面前缀目录为根遍历"""
+        norm = source_str.replace("\\", "/")
+        while norm.startswith("./"):
+            norm = norm[2:]
+        prefix = literal_prefix(norm)
+        root = "/".join(prefix) or "."
+        rest = norm[len(root) + 1:] if prefix else norm
+        return self.glob(root, rest)
+
+    # 监听模式下的增量同步
+    @staticmethod
+    def _relative(abs_path, key):
+        rel = os.path.relpath(abs_path, os.path.abspath(key))
+        if rel == ".." or rel.startswith(".." + os.sep) or os.path.isabs(rel):
+            return None
+        return rel.replace("\\", "/")
+
+    def update_file(self, file_path, exists):
+        """文件新增或删除后同步已缓存的遍历结果，不重新遍历目录"""
+        abs_path = os.path.abspath(file_path)
+        with self._lock:
+            for key, files in self._walks.items():
+                rel = self._relative(abs_path, key)
+                if rel is None:
+                    continue
+                present = rel in files
+                if exists and not present:
+                    files.append(rel)
+                    files.sort(key=lambda p: p.split("/"))
+                elif not exists and present:
+                    files.remove(rel)
+                else:
+                    continue
+                for glob_key in [k for k in self._globs if k[0] == key]:
+                    del self._globs[glob_key]
+
+    def known_files_under(self, dir_path):
+        """已缓存结果中位于 dir_path 之下的文件（绝对路径），用于目录被整体移走的场景"""
+        abs_dir = os.path.abspath(dir_path)
+        found = set()
+        with self._lock:
+            for key, files in self._walks.items():
+                rel_dir = self._relative(abs_dir, key)
+                if rel_dir is None:
+                    continue
+                prefix = "" if rel_dir == "." else rel_dir + "/"
+                for rel in files:
+                    if rel.startswith(prefix):
+                        found.add(os.path.join(os.path.abspath(key), rel))
+        return sorted(found)
+
+    def invalidate_under(self, dir_path):
+        """
+        丢弃与 dir_path 重叠（位于其下或包含它）的遍历结果，下次使用时重新遍历
+        用于批量运行中前一个配置写入了后一个配置的源目录的场景
+        """
+        abs_dir = os.path.abspath(dir_path)
+        with self._lock:
+            stale = [
+                key
+                for key in self._walks
+                if self._relative(key, abs_dir) is not None or self._relative(abs_dir, key) is not None
+            ]
+            for key in stale:
+                del self._walks[key]
+            for glob_key in [k for k in self._globs if k[0] in stale]:
+                del self._globs[glob_key]
+
+    def reset_stats(self):
+        with self._lock:
+            self.walks = 0
+            self.hits = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._walks.clear()
+            self._globs.clear()
+
+    def stats(self):
+        return {"walks": self.walks, "hits": self.hits}
+
+
+def supports(pattern):
+    """WalkCache 可处理的相对 glob 模式（绝对路径与 .. 交给 Path.glob）"""
+    norm = pattern.replace("\\", "/")
+    if norm.startswith("/") or (len(norm) > 1 and norm[1] == ":"):
+        return False
+    return ".." not in norm.split("/")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监听模式：源目录或配置文件变化后按需重新分发
+
+Linux 下通过 ctypes 调用 inotify（无第三方依赖），其他平台或 --watch-poll 时退回定时轮询
+短时间内的连续变化（编辑器保存、git checkout）合并为一次处理
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from scripts import log
+from scripts.paths import source_roots
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+DEFAULT_DEBOUNCE_MS = 200
+
+
+class InotifyWatcher:
+    """
+    递归监听 roots 下的所有目录（新建目录自动加入监听），files 只监听其所在目录
+    read(timeout) 返回变化路径（绝对路径）集合
+    """
+
+    def __init__(self, roots, files=()):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 失败: {os.strerror(errno)}")
+        self.roots = [os.path.abspath(root) for root in roots]
+        self._dirs = {}
+        for root in self.roots:
+            self._add_tree(root)
+        for file_path in files:
+            self._add_watch(os.path.dirname(os.path.abspath(file_path)))
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+        else:
+            log.debug("  ⚠️  无法监听目录 %s: %s", directory, os.strerror(ctypes.get_errno()))
+
+    def _add_tree(self, root):
+        for dirpath, _, _ in os.walk(root):
+            self._add_watch(dirpath)
+
+    def read(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size: offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出：整棵源目录按变化处理
+                changed.update(self.roots)
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(path)
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """定时比较文件的 (size, mtime)，用于不支持 inotify 的平台"""
+
+    def __init__(self, roots, files=(), interval=0.5):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.files = [os.path.abspath(file_path) for file_path in files]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    @staticmethod
+    def _stat(path, snapshot):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        snapshot[path] = (st.st_size, st.st_mtime_ns)
+
+    def _scan(self):
+        snapshot = {}
+        for root in self.roots:
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    self._stat(os.path.join(dirpath, name), snapshot)
+        for file_path in self.files:
+            self._stat(file_path, snapshot)
+        return snapshot
+
+    def read(self, timeout=None):
+        deadline = float("inf") if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def wait_for_changes(watcher, debounce):
+    """阻塞到出现变化，再持续收集直到 debounce 秒内没有新的变化"""
+    changed = set()
+    while not changed:
+        changed = watcher.read(None)
+    while True:
+        more = watcher.read(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def watch_roots(tasks):
+    """所有任务 source 对应的监听目录（去掉被其他目录包含的子目录）"""
+    roots = set()
+    for task in tasks:
+        for dist_rule in task.get("distribute", []):
+            source_config = dist_rule.get("source")
+            if source_config:
+                roots.update(os.path.abspath(root) for root in source_roots(source_config))
+    result = []
+    for root in sorted(roots):
+        if not os.path.isdir(root):
+            log.summary("  ⚠️  监听目录不存在，跳过: %s", root)
+            continue
+        if any(root.startswith(parent.rstrip(os.sep) + os.sep) for parent in result):
+            continue
+        result.append(root)
+    return result
+
+
+def make_watcher(roots, files, poll=False):
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots, files)
+        except (OSError, AttributeError) as e:
+            log.summary("  ⚠️  inotify 不可用，改用轮询: %s", e)
+    return PollingWatcher(roots, files)
+
+
+def watch(config_file, build, poll=False, debounce_ms=DEFAULT_DEBOUNCE_MS):
+    """
+    build(): 加载配置并返回新的 Distributor
+    配置文件变化时重新加载并完整运行一次，其余变化交给 Distributor.process_changes
+    """
+    config_file = os.path.abspath(config_file)
+    debounce = max(0, debounce_ms) / 1000
+
+    while True:
+        distributor = build()
+        distributor.run()
+        roots = watch_roots(distributor.tasks)
+        watcher = make_watcher(roots, [config_file], poll)
+        log.summary(
+            "\n👀 监听中 (%s，%d 个目录)，Ctrl+C 退出",
+            "轮询" if isinstance(watcher, PollingWatcher) else "inotify",
+            len(roots),
+            event="watch",
+            roots=roots,
+        )
+        log.flush()
+
+        try:
+            while True:
+                changed = wait_for_changes(watcher, debounce)
+                if config_file in changed:
+                    log.summary("\n⚙️  配置文件已变化，重新加载: %s", config_file)
+                    break
+                try:
+                    distributor.process_changes(changed)
+                except Exception as e:
+                    log.error("\n❌ 重新分发失败: %s", e, event="error")
+                    log.flush()
+        except KeyboardInterrupt:
+            log.summary("\n👋 已退出监听")
+            log.flush()
+            return
+        finally:
+            watcher.close()